@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# announcements.py -- Udacity conference server-side Python App Engine API; nearly sold out announcement
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+from google.appengine.api import memcache
+from google.appengine.ext import ndb
+
+from models import Announcement
+from models import Conference
+
+MEMCACHE_ANNOUNCEMENTS_KEY = "ANNOUNCEMENT_NEW"
+MEMCACHE_ANNOUNCEMENTS_LOCK_KEY = "ANNOUNCEMENT_NEW_LOCK"
+ANNOUNCEMENTS_LOCK_TIME = 10
+ANNOUNCEMENT_ID = 'nearly-sold-out'
+# conferences with this many seats left or fewer (but not sold out) are announced
+NEARLY_SOLD_OUT_SEATS = 5
+
+
+def isNearlySoldOut(seatsAvailable):
+    """True if a conference with these seats left belongs in the announcement."""
+    return 0 < (seatsAvailable or 0) <= NEARLY_SOLD_OUT_SEATS
+
+
+def _announcementKey():
+    return ndb.Key(Announcement, ANNOUNCEMENT_ID)
+
+
+def _formatAnnouncement(conferences):
+    """Format the announcement text from websafe key -> name."""
+    if not conferences:
+        return ""
+    return '%s %s' % (
+        'Last chance to attend! The following conferences '
+        'are nearly sold out:',
+        ', '.join(sorted(conferences.values())))
+
+
+def getAnnouncement():
+    """Return the announcement, rebuilding memcache from the datastore on a miss."""
+    announcement = memcache.get(MEMCACHE_ANNOUNCEMENTS_KEY)
+    if announcement is not None:
+        return announcement
+
+    ann = _announcementKey().get()
+    # only the request holding the lock rebuilds & re-caches the announcement;
+    # the others answer from the durable copy without writing
+    if not memcache.add(MEMCACHE_ANNOUNCEMENTS_LOCK_KEY, 1,
+                        time=ANNOUNCEMENTS_LOCK_TIME):
+        return _formatAnnouncement(ann and ann.conferences)
+    try:
+        if not ann:
+            return rebuildAnnouncement()
+        announcement = _formatAnnouncement(ann.conferences)
+        memcache.set(MEMCACHE_ANNOUNCEMENTS_KEY, announcement)
+        return announcement
+    finally:
+        memcache.delete(MEMCACHE_ANNOUNCEMENTS_LOCK_KEY)
+
+
+def rebuildAnnouncement():
+    """Rebuild the durable announcement from Conference.seatsAvailable.
+
+    Only repairs the conferences that differ, so it is cheap when in sync."""
+    confs = Conference.query(ndb.AND(
+        Conference.seatsAvailable <= NEARLY_SOLD_OUT_SEATS,
+        Conference.seatsAvailable > 0)
+    ).fetch(projection=[Conference.name])
+    expected = dict((conf.key.urlsafe(), conf.name) for conf in confs)
+
+    @ndb.transactional
+    def _repair():
+        ann = _announcementKey().get() or Announcement(key=_announcementKey())
+        if ann.conferences != expected:
+            ann.conferences = expected
+            ann.put()
+        return ann
+    ann = _repair()
+
+    announcement = _formatAnnouncement(ann.conferences)
+    memcache.set(MEMCACHE_ANNOUNCEMENTS_KEY, announcement)
+    return announcement
+
+
+def seatsChanged(wsck, name, oldSeats, newSeats):
+    """Add or remove a conference when its seats move into or out of the band."""
+    inBand = isNearlySoldOut(newSeats)
+    if isNearlySoldOut(oldSeats) == inBand:
+        return
+
+    @ndb.transactional
+    def _update():
+        ann = _announcementKey().get() or Announcement(key=_announcementKey())
+        conferences = ann.conferences or {}
+        if inBand:
+            conferences[wsck] = name
+        else:
+            conferences.pop(wsck, None)
+        ann.conferences = conferences
+        ann.put()
+        return ann
+    ann = _update()
+    memcache.set(MEMCACHE_ANNOUNCEMENTS_KEY, _formatAnnouncement(ann.conferences))
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# benchmark.py -- Udacity conference server-side Python App Engine API; load & latency benchmarks on local stubs
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+"""Benchmark ConferenceApi endpoints on the App Engine testbed stubs.
+
+Fills the local datastore stub with synthetic profiles, conferences,
+sessions & wishlists at each scale, drives the endpoints & reports per
+endpoint p50/p95 latency, RPC counts by service & memory growth.
+
+    python benchmark.py --sdk ~/google-cloud-sdk/platform/google_appengine
+    python benchmark.py --scales 10,100 --save-baseline
+    python benchmark.py --baseline
+
+With --baseline the results are compared with a stored run & the script
+exits with status 1 if an endpoint got slower than --tolerance or issues
+more RPCs, so regressions show up in review.
+
+The baseline lives in benchmark_baseline.json next to this script & is
+committed. Latencies depend on the machine, so it is regenerated with
+--save-baseline on the machine that compares against it, and committed
+again together with a change that is meant to move the numbers.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+from datetime import date
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(APP_DIR, 'benchmark_baseline.json')
+
+CITIES = ['London', 'Paris', 'Tokyo', 'Chicago', 'Delhi', 'Berlin', 'Sydney', 'Toronto']
+TOPICS = ['Medical Innovations', 'Programming Languages', 'Web Technologies',
+          'Movie Making', 'Health and Nutrition']
+SPEAKERS = ['Jane Doe', 'John Roe', 'Ada Lovelace', 'Alan Turing', 'Grace Hopper',
+            'Vineeta', 'Linus Torvalds', 'Barbara Liskov']
+SESSION_TYPES = ['Workshop', 'Lecture', 'Keynote', 'Webninar']
+
+
+def _setupSdk(sdk):
+    """Put the App Engine SDK & its bundled libraries on sys.path."""
+    if sdk:
+        sys.path.insert(0, sdk)
+    try:
+        import dev_appserver
+    except ImportError:
+        sys.exit('App Engine SDK not found; pass --sdk or set GAE_SDK.')
+    dev_appserver.fix_sys_path()
+    sys.path.insert(0, APP_DIR)
+
+
+class RpcCounter(object):
+    """Counts the API calls (datastore_v3.Get, memcache.Set, ...) made
+    through the stubs."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def count(self, service, call, request, response):
+        name = '%s.%s' % (service, call)
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def reset(self):
+        self.counts = {}
+
+
+class Bench(object):
+    """Testbed, synthetic data & endpoint drivers of one scale."""
+
+    def __init__(self, scale, sessionsPerConference, seed):
+        from google.appengine.api import apiproxy_stub_map
+        from google.appengine.datastore import datastore_stub_util
+        from google.appengine.ext import testbed
+
+        self.scale = scale
+        self.sessionsPerConference = sessionsPerConference
+        self.random = random.Random(seed)
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        # high replication behaviour, but queries see every write so the
+        # numbers do not depend on the consistency simulation
+        self.testbed.init_datastore_v3_stub(
+            consistency_policy=datastore_stub_util.PseudoRandomHRConsistencyPolicy(probability=1),
+            require_indexes=False)
+        self.testbed.init_memcache_stub()
+        self.testbed.init_taskqueue_stub(root_path=APP_DIR)
+        self.testbed.init_urlfetch_stub()
+        self.testbed.init_user_stub()
+        self.rpcs = RpcCounter()
+        apiproxy_stub_map.apiproxy.GetPreCallHooks().Append('benchmark', self.rpcs.count)
+
+    def close(self):
+        self.testbed.deactivate()
+
+    def login(self, email):
+        """Make endpoints.get_current_user() return the user of email."""
+        import endpoints
+        from google.appengine.api import users
+        user = users.User(email)
+        endpoints.get_current_user = lambda: user
+
+    def populate(self):
+        """Write scale conferences spread across cities, topics & months,
+        their sessions, scale profiles & their wishlists."""
+        from google.appengine.ext import ndb
+        import seats
+        from conference import ConferenceApi
+        from models import Conference, Profile, Session, WishList
+
+        rnd = self.random
+        self.emails = ['user%d@example.com' % i for i in range(self.scale)]
+        profiles = [Profile(key=ndb.Key(Profile, email), userId=email,
+                            displayName=email.split('@')[0], mainEmail=email)
+                    for email in self.emails]
+        ndb.put_multi(profiles)
+
+        conferences = []
+        for i in range(self.scale):
+            month = rnd.randint(1, 12)
+            maxAttendees = rnd.choice([5, 50, 500])
+            startDate = date(2016, month, rnd.randint(1, 20))
+            conferences.append(Conference(
+                parent=profiles[i % len(profiles)].key,
+                name='Conference %d' % i,
+                organizerUserId=profiles[i % len(profiles)].userId,
+                city=rnd.choice(CITIES), topics=rnd.sample(TOPICS, 2),
+                month=month, startDate=startDate,
+                endDate=date(2016, month, startDate.day + 2),
+                maxAttendees=maxAttendees, seatsAvailable=maxAttendees))
+        self.conferenceKeys = ndb.put_multi(conferences)
+        ndb.Future.wait_all([seats.createShardsAsync(conf.key, conf.maxAttendees,
+                                                     conf.seatsAvailable)
+                             for conf in conferences])
+
+        sessions = []
+        for conf in conferences:
+            for j in range(self.sessionsPerConference):
+                sessions.append(Session(
+                    parent=conf.key, name='Session %d' % j,
+                    webSafeConferenceKey=conf.key.urlsafe(),
+                    speaker=rnd.choice(SPEAKERS), typeOfSession=rnd.choice(SESSION_TYPES),
+                    duration=rnd.randint(1, 3), date=conf.startDate,
+                    startTime=rnd.randint(8, 20)))
+        self.sessionKeys = ndb.put_multi(sessions)
+
+        wishLists = []
+        for email in self.emails:
+            for s_key in rnd.sample(self.sessionKeys, min(3, len(self.sessionKeys))):
+                wishLists.append(WishList(
+                    key=ConferenceApi._wishListKey(email, s_key.urlsafe()),
+                    userId=email, sessionKey=s_key.urlsafe()))
+        ndb.put_multi(wishLists)
+
+    def scenarios(self):
+        """Return (name, callable) pairs; each call is one endpoint request."""
+        from conference import CONF_GET_REQUEST
+        from conference import CONF_SESSIONS_GET_REQUEST
+        from conference import PAGE_GET_REQUEST
+        from conference import ConferenceApi
+        from conference import WISHLIST_GET_REQUEST
+        from models import ConferenceQueryForm
+        from models import ConferenceQueryForms
+        from protorpc import message_types
+
+        api = ConferenceApi()
+        rnd = self.random
+        confRequest = CONF_GET_REQUEST.combined_message_class
+        sessionsRequest = CONF_SESSIONS_GET_REQUEST.combined_message_class
+        wishListRequest = WISHLIST_GET_REQUEST.combined_message_class
+        pageRequest = PAGE_GET_REQUEST.combined_message_class
+
+        def anyUser():
+            self.login(rnd.choice(self.emails))
+
+        def anyConference():
+            return rnd.choice(self.conferenceKeys).urlsafe()
+
+        def query(*filters):
+            return ConferenceQueryForms(filters=[
+                ConferenceQueryForm(field=field, operator=op, value=value)
+                for field, op, value in filters])
+
+        def queryByCity():
+            anyUser()
+            api.queryConferences(query(('CITY', 'EQ', rnd.choice(CITIES))))
+
+        def queryByTopicAndMonth():
+            anyUser()
+            api.queryConferences(query(('TOPIC', 'EQ', rnd.choice(TOPICS)),
+                                       ('MONTH', 'EQ', str(rnd.randint(1, 12)))))
+
+        def queryTwoInequalities():
+            anyUser()
+            api.queryConferences(query(('MONTH', 'GT', '6'),
+                                       ('MAX_ATTENDEES', 'LT', '100')))
+
+        def queryNotEqualPages():
+            anyUser()
+            # != runs as two queries; its pages must still chain
+            request = query(('CITY', 'NE', rnd.choice(CITIES)))
+            request.pageSize = 5
+            page = api.queryConferences(request)
+            if page.nextPageToken:
+                request.pageToken = page.nextPageToken
+                api.queryConferences(request)
+
+        def conferenceSchedule():
+            anyUser()
+            api.getConferenceSessions(sessionsRequest(websafeConferenceKey=anyConference()))
+
+        def conferenceSessionsPage():
+            anyUser()
+            api.getConferenceSessions(sessionsRequest(websafeConferenceKey=anyConference(),
+                                                      pageSize=10))
+
+        def filteredSessions():
+            anyUser()
+            api.getFilteredSessions(pageRequest())
+
+        def registration():
+            anyUser()
+            request = confRequest(websafeConferenceKey=anyConference())
+            api._conferenceRegistration(request)
+            api._conferenceRegistration(request, reg=False)
+
+        def wishList():
+            anyUser()
+            request = wishListRequest(sessionKey=rnd.choice(self.sessionKeys).urlsafe())
+            api.addSessionToWishlist(request)
+            api.getSessionsInWishlist(message_types.VoidMessage())
+            api.deleteSessionInWishlist(request)
+
+        return [
+            ('queryConferences/city', queryByCity),
+            ('queryConferences/topic+month', queryByTopicAndMonth),
+            ('queryConferences/two-inequalities', queryTwoInequalities),
+            ('queryConferences/not-equal pages', queryNotEqualPages),
+            ('getConferenceSessions/schedule', conferenceSchedule),
+            ('getConferenceSessions/page', conferenceSessionsPage),
+            ('getFilteredSessions', filteredSessions),
+            ('_conferenceRegistration', registration),
+            ('wishlist add/get/delete', wishList),
+        ]
+
+    def run(self, iterations):
+        """Drive every scenario & return {name: stats}."""
+        import endpoints
+        from google.appengine.ext import ndb
+
+        results = {}
+        for name, scenario in self.scenarios():
+            latencies = []
+            self.rpcs.reset()
+            rssBefore = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            errors = 0
+            for i in range(iterations):
+                # every request starts with an empty ndb context cache
+                ndb.get_context().clear_cache()
+                start = time.time()
+                try:
+                    scenario()
+                except endpoints.ServiceException:
+                    # e.g. a query too broad for the planner at this scale
+                    errors += 1
+                latencies.append((time.time() - start) * 1000)
+            latencies.sort()
+            results[name] = {
+                'p50_ms': round(_percentile(latencies, 50), 2),
+                'p95_ms': round(_percentile(latencies, 95), 2),
+                'rpcs_per_call': dict((rpc, round(float(count) / iterations, 2))
+                                      for rpc, count in self.rpcs.counts.items()),
+                'maxrss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rssBefore,
+                'errors': errors,
+            }
+        return results
+
+
+def _percentile(values, pct):
+    """Return the pct percentile of sorted values (nearest rank)."""
+    if not values:
+        return 0.0
+    rank = max(0, int(round(pct / 100.0 * len(values))) - 1)
+    return values[min(rank, len(values) - 1)]
+
+
+def _report(results):
+    for scale in sorted(results, key=int):
+        print('\nscale %s' % scale)
+        print('%-36s %9s %9s %7s %9s  %s' % ('endpoint', 'p50 ms', 'p95 ms', 'rpcs',
+                                           'rss kb', 'errors'))
+        for name, stats in sorted(results[scale].items()):
+            print('%-36s %9.2f %9.2f %7.1f %9d  %d' % (
+                name, stats['p50_ms'], stats['p95_ms'],
+                sum(stats['rpcs_per_call'].values()),
+                stats['maxrss_growth_kb'], stats['errors']))
+
+
+def _compare(results, baseline, tolerance):
+    """Return the regressions of results against baseline as strings."""
+    regressions = []
+    for scale, byEndpoint in sorted(results.items()):
+        for name, stats in sorted(byEndpoint.items()):
+            old = baseline.get(scale, {}).get(name)
+            if not old:
+                continue
+            if stats['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+                regressions.append('scale %s %s: p95 %.2f ms, baseline %.2f ms' % (
+                    scale, name, stats['p95_ms'], old['p95_ms']))
+            for rpc, count in sorted(stats['rpcs_per_call'].items()):
+                if count > old['rpcs_per_call'].get(rpc, 0):
+                    regressions.append('scale %s %s: %.2f %s per call, baseline %.2f' % (
+                        scale, name, count, rpc, old['rpcs_per_call'].get(rpc, 0)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sdk', default=os.environ.get('GAE_SDK'),
+                        help='App Engine SDK directory (google_appengine)')
+    parser.add_argument('--scales', default='10,100,1000',
+                        help='comma separated numbers of conferences & profiles')
+    parser.add_argument('--sessions', type=int, default=10,
+                        help='sessions per conference')
+    parser.add_argument('--iterations', type=int, default=50,
+                        help='requests per endpoint & scale')
+    parser.add_argument('--seed', type=int, default=2016)
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE,
+                        default=None, help='compare with this baseline file')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE,
+                        default=None, help='store the results as baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 slowdown against the baseline')
+    args = parser.parse_args()
+    # fail before the slow run, not after it
+    if args.baseline and not os.path.exists(args.baseline):
+        parser.error('no baseline at %s; store one with --save-baseline & commit it'
+                     % args.baseline)
+
+    _setupSdk(args.sdk)
+    results = {}
+    for scale in [int(s) for s in args.scales.split(',')]:
+        bench = Bench(scale, args.sessions, args.seed)
+        try:
+            bench.populate()
+            results[str(scale)] = bench.run(args.iterations)
+        finally:
+            bench.close()
+    _report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('\nbaseline written to %s' % args.save_baseline)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = _compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('\nregressions:')
+            for regression in regressions:
+                print('  ' + regression)
+            sys.exit(1)
+        print('\nno regressions against %s' % args.baseline)
+
+
+if __name__ == '__main__':
+    main()
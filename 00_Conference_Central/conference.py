@@ -7,18 +7,26 @@
 
 #import all the required modules
 
+import bisect
 from datetime import datetime
 import json
+import logging
 import os
+import sys
 import time
 
 import endpoints
 from protorpc import messages
 from protorpc import message_types
+from protorpc import protobuf
 from protorpc import remote
 
+from google.appengine.api import datastore_errors
+from google.appengine.api import oauth
+from google.appengine.api import search
 from google.appengine.api import urlfetch
 from google.appengine.ext import ndb
+from google.net.proto.ProtocolBuffer import ProtocolBufferDecodeError
 
 from models import Profile
 from models import ProfileMiniForm
@@ -26,6 +34,18 @@ from models import ProfileForm
 from models import TeeShirtSize
 
 from utils import getUserId
+import seats
+import announcements
+import datebuckets
+import dispatch
+import facets
+import querycache
+import queryplanner
+import registrations
+import schedules
+import searchindex
+import speakers
+import tracing
 from models import Conference
 from models import ConferenceForm
 from models import ConferenceForms
@@ -45,18 +65,39 @@ from models import WishListForms
 from models import BooleanMessage
 from models import ConflictException
 
+from serializers import CONFERENCE_PLAN
+from serializers import PROFILE_PLAN
+from serializers import SESSION_PLAN
+from serializers import WISHLIST_PLAN
+
 from settings import WEB_CLIENT_ID
 
 from google.appengine.api import memcache
-from google.appengine.api import taskqueue
 
 from models import StringMessage
+from models import FilteredSessionsForm
+from models import AttendeeForms
+from models import BatchResultForm
+from models import BatchResultForms
+from models import SpeakerForm
+from models import SpeakerForms
+from models import QueryCacheStatsForm
+from models import DispatchStatForm
+from models import DispatchStatsForm
+from models import RpcStatForm
+from models import TraceStatForm
+from models import TraceStatsForm
+from models import SpeakerTally
+from models import FacetCountForm
+from models import ConferenceFacetsForm
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 EMAIL_SCOPE = endpoints.EMAIL_SCOPE
 API_EXPLORER_CLIENT_ID = endpoints.API_EXPLORER_CLIENT_ID
-MEMCACHE_ANNOUNCEMENTS_KEY = "ANNOUNCEMENT_NEW"
-MEMCACHE_FEATURED_SPEAKER_KEY = "FEATURED_SPEAKER"
+MEMCACHE_FEATURED_SPEAKER_KEY = "FEATURED_SPEAKER_%s"
+MEMCACHE_SPEAKERS_KEY = "SPEAKERS_%s"
+SPEAKERS_CACHE_TIME = 3600
+SPEAKERS_CACHE_LOCK_TIME = 5
 DEFAULTS = {
         "city": "Default City",
         "maxAttendees": 0,
@@ -83,16 +124,77 @@ FIELDS =    {
             'TOPIC': 'topics',
             'MONTH': 'month',
             'MAX_ATTENDEES': 'maxAttendees',
+            'START_DATE': 'startDate',
+            # conferences overlapping "YYYY-MM-DD/YYYY-MM-DD"; EQ only
+            'DATE_RANGE': 'dateRange',
+            }
+SESSION_FIELDS = {
+            'CONFERENCE': 'webSafeConferenceKey',
+            'SPEAKER': 'speaker',
+            'TYPE': 'typeOfSession',
+            'DATE': 'date',
+            'START_TIME': 'startTime',
+            'DURATION': 'duration',
+            'NAME': 'name',
             }
+# filter values are converted to the type of their property
+INTEGER_FIELDS = ('month', 'maxAttendees', 'startTime', 'duration')
+DATE_FIELDS = ('date', 'startDate')
+WISHLIST_MIGRATION_BATCH = 100
+SESSION_MIGRATION_BATCH = 100
+# stands for the ancestor of an ancestor query in PROJECTION_INDEXES
+ANCESTOR = '__ancestor__'
+# Composite indexes in index.yaml that let list queries run as projection queries:
+# (kind, equality filter properties, sort orders, projected properties)
+PROJECTION_INDEXES = (
+    ('Conference', (), ('name',),
+        ('name', 'city', 'startDate', 'endDate', 'maxAttendees', 'seatsAvailable')),
+    ('Session', (ANCESTOR,), (),
+        ('name', 'webSafeConferenceKey', 'speaker', 'typeOfSession', 'date',
+         'startTime', 'duration')),
+    ('Session', ('speaker',), (),
+        ('name', 'webSafeConferenceKey', 'typeOfSession', 'date', 'startTime', 'duration')),
+)
+# properties needed to produce a field besides the field's own property
+FIELD_DEPENDENCIES = {
+    'seatsAvailable': ('maxAttendees',),
+}
+# largest batch accepted by the bulk endpoints & entities per put_multi
+BULK_MAX_ITEMS = 200
+BULK_PUT_CHUNK = 100
+# page size used by the list endpoints when the client does not send one
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 #Requets
 CONF_GET_REQUEST = endpoints.ResourceContainer(
     message_types.VoidMessage,
     websafeConferenceKey=messages.StringField(1),
 )
+CONF_SESSIONS_GET_REQUEST = endpoints.ResourceContainer(
+    message_types.VoidMessage,
+    websafeConferenceKey=messages.StringField(1),
+    pageSize=messages.IntegerField(2, variant=messages.Variant.INT32),
+    pageToken=messages.StringField(3),
+    fields=messages.StringField(4, repeated=True),
+)
 SPEAKER_GET_REQUEST = endpoints.ResourceContainer(
     message_types.VoidMessage,
     speaker=messages.StringField(1),
+    pageSize=messages.IntegerField(2, variant=messages.Variant.INT32),
+    pageToken=messages.StringField(3),
+    fields=messages.StringField(4, repeated=True),
+)
+PAGE_GET_REQUEST = endpoints.ResourceContainer(
+    message_types.VoidMessage,
+    pageSize=messages.IntegerField(1, variant=messages.Variant.INT32),
+    pageToken=messages.StringField(2),
+)
+CONF_PAGE_GET_REQUEST = endpoints.ResourceContainer(
+    message_types.VoidMessage,
+    websafeConferenceKey=messages.StringField(1),
+    pageSize=messages.IntegerField(2, variant=messages.Variant.INT32),
+    pageToken=messages.StringField(3),
 )
 CONF_SESSION_TYPE_GET_REQUEST = endpoints.ResourceContainer(
     message_types.VoidMessage,
@@ -118,16 +220,7 @@ class ConferenceApi(remote.Service):
 
     def _copyProfileToForm(self, prof):
         """Copy relevant fields from Profile to ProfileForm."""
-        pf = ProfileForm()
-        for field in pf.all_fields():
-            if hasattr(prof, field.name):
-                # convert t-shirt string to Enum; just copy others
-                if field.name == 'teeShirtSize':
-                    setattr(pf, field.name, getattr(TeeShirtSize, getattr(prof, field.name)))
-                else:
-                    setattr(pf, field.name, getattr(prof, field.name))
-        pf.check_initialized()
-        return pf
+        return PROFILE_PLAN.copy(prof)
 
     def _getProfileFromUser(self):
         """Return user Profile from datastore, creating new one if non-existent."""
@@ -137,8 +230,9 @@ class ConferenceApi(remote.Service):
         profile = None
         userID = getUserId(user)
         userID_key = ndb.Key(Profile, userID)
+        # served from the request context cache or memcache when possible
         profile = userID_key.get()
-        # If Profile not in datastore already, create new
+        # If Profile not in datastore already, create new; only then it is written
         if not profile:
             profile = Profile(
                 userId = userID,
@@ -147,7 +241,7 @@ class ConferenceApi(remote.Service):
                 mainEmail= user.email(),
                 teeShirtSize = str(TeeShirtSize.NOT_SPECIFIED),
             )
-        profile.put()
+            profile.put()
         return profile
 
     def _doProfile(self, save_request=None):
@@ -156,12 +250,16 @@ class ConferenceApi(remote.Service):
         prof = self._getProfileFromUser()
         # if saveProfile(), process user-modifyable fields
         if save_request:
+            dirty = False
             for field in ('displayName', 'teeShirtSize'):
                 if hasattr(save_request, field):
                     val = getattr(save_request, field)
-                    if val:
+                    if val and getattr(prof, field) != str(val):
                         setattr(prof, field, str(val))
-            prof.put()
+                        dirty = True
+            # write only if a field actually changed
+            if dirty:
+                prof.put()
         # return ProfileForm
         return self._copyProfileToForm(prof)
 
@@ -181,21 +279,9 @@ class ConferenceApi(remote.Service):
 
     def _copyConferenceToForm(self, conf, displayName):
         """Copy relevant fields from Conference to ConferenceForm."""
-        cf = ConferenceForm()
-        for field in cf.all_fields():
-            if hasattr(conf, field.name):
-                # convert Date to date string; just copy others
-                if field.name.endswith('Date'):
-                    setattr(cf, field.name, str(getattr(conf, field.name)))
-                else:
-                    setattr(cf, field.name, getattr(conf, field.name))
-            elif field.name == "websafeKey":
-                setattr(cf, field.name, conf.key.urlsafe())
-        if displayName:
-            setattr(cf, 'organizerDisplayName', displayName)
-        cf.check_initialized()
-        return cf
+        return CONFERENCE_PLAN.copy(conf, organizerDisplayName=displayName)
 
+    @ndb.synctasklet
     def _createConferenceObject(self, request):
         """Create or update Conference object, returning ConferenceForm/request."""
         # preload necessary data items
@@ -207,6 +293,37 @@ class ConferenceApi(remote.Service):
         if not request.name:
             raise endpoints.BadRequestException("Conference 'name' field required")
 
+        data = self._conferenceData(request)
+
+        # make Profile Key from user ID
+        p_key = ndb.Key(Profile, user_id)
+        # allocate new Conference ID with Profile key as parent
+        c_ids = yield Conference.allocate_ids_async(size=1, parent=p_key)
+        # make Conference key from ID
+        c_key = ndb.Key(Conference, c_ids[0], parent=p_key)
+        data['key'] = c_key
+        data['organizerUserId'] = request.organizerUserId = user_id
+
+        # create Conference with its facet counts & its seat shards
+        # concurrently; shards of a failed conference are never read
+        conf = Conference(**data)
+        yield (facets.putConferencesAsync([conf]),
+               seats.createShardsAsync(c_key, data['maxAttendees'], data['seatsAvailable']))
+        # have a mail sent to owner when ever new conference is added
+        yield self._confirmConferencesAsync(user_id, user.email(), [repr(request)])
+
+        # cached conference queries may now be missing this conference
+        querycache.invalidate('Conference')
+        self._indexConferences([conf])
+        # small conferences are nearly sold out from the start
+        announcements.seatsChanged(c_key.urlsafe(), data['name'], 0, data['seatsAvailable'])
+
+        # return (modified) ConferenceForm
+        raise ndb.Return(request)
+
+    def _conferenceData(self, request):
+        """Copy a ConferenceForm into Conference properties, filling in defaults
+        (in the form as well); raises ValueError for malformed dates."""
         # copy ConferenceForm/ProtoRPC Message into dict
         data = {field.name: getattr(request, field.name) for field in request.all_fields()}
         del data['websafeKey']
@@ -226,31 +343,14 @@ class ConferenceApi(remote.Service):
             data['month'] = 0
         if data['endDate']:
             data['endDate'] = datetime.strptime(data['endDate'][:10], "%Y-%m-%d").date()
+        data['dateBuckets'] = datebuckets.conferenceBuckets(data['startDate'], data['endDate'])
 
         # set seatsAvailable to be same as maxAttendees on creation
         # both for data model & outbound Message
         if data["maxAttendees"] > 0:
             data["seatsAvailable"] = data["maxAttendees"]
             setattr(request, "seatsAvailable", data["maxAttendees"])
-
-        # make Profile Key from user ID
-        p_key = ndb.Key(Profile, user_id)
-        # allocate new Conference ID with Profile key as parent
-        c_id = Conference.allocate_ids(size=1, parent=p_key)[0]
-        # make Conference key from ID
-        c_key = ndb.Key(Conference, c_id, parent=p_key)
-        data['key'] = c_key
-        data['organizerUserId'] = request.organizerUserId = user_id
-
-        # create Conference & return (modified) ConferenceForm
-        Conference(**data).put()
-        # Add a task to send a mail to owner when ever new conference is added
-        taskqueue.add(params={'email': user.email(),
-            'conferenceInfo': repr(request)},
-            url='/tasks/send_confirmation_email'
-        )
-
-        return request
+        return data
 
     @endpoints.method(ConferenceForm, ConferenceForm, path='conference',
             http_method='POST', name='createConference')
@@ -258,23 +358,208 @@ class ConferenceApi(remote.Service):
         """Create new conference."""
         return self._createConferenceObject(request)
 
+    @endpoints.method(ConferenceForms, BatchResultForms, path='conferences/import',
+            http_method='POST', name='importConferences')
+    def importConferences(self, request):
+        """Create many conferences, reporting the outcome of every item."""
+        user = endpoints.get_current_user()
+        if not user:
+            raise endpoints.UnauthorizedException('Authorization required')
+        user_id = getUserId(user)
+        self._checkBatchSize(request.items)
+        results = [BatchResultForm(index=i) for i in range(len(request.items))]
+
+        # validate the whole payload first
+        valid = []
+        for i, form in enumerate(request.items):
+            if not form.name:
+                results[i].error = "Conference 'name' field required"
+                continue
+            try:
+                valid.append((i, form, self._conferenceData(form)))
+            except ValueError:
+                results[i].error = "Dates must be YYYY-MM-DD."
+
+        # one id range for all conferences, under the user's Profile
+        p_key = ndb.Key(Profile, user_id)
+        pending = []
+        if valid:
+            start, end = Conference.allocate_ids(size=len(valid), parent=p_key)
+            for c_id, (i, form, data) in zip(range(start, end + 1), valid):
+                data['key'] = ndb.Key(Conference, c_id, parent=p_key)
+                data['organizerUserId'] = form.organizerUserId = user_id
+                pending.append((i, Conference(**data)))
+        # the conferences are one entity group; they are written in a single
+        # transaction, with their facet counts
+        created = self._putInChunks(pending, results, facets.putConferencesAsync,
+                                    BULK_MAX_ITEMS)
+
+        # the seat shards of the created conferences, written together
+        ndb.Future.wait_all([seats.createShardsAsync(conf.key, conf.maxAttendees,
+                                                     conf.seatsAvailable)
+                             for conf in created])
+        if created:
+            # the confirmations are coalesced into a single mail
+            self._confirmConferencesAsync(user_id, user.email(),
+                [repr(request.items[i]) for i, conf in pending if results[i].websafeKey]
+            ).get_result()
+            querycache.invalidate('Conference')
+            self._indexConferences(created)
+        for conf in created:
+            announcements.seatsChanged(conf.key.urlsafe(), conf.name, 0, conf.seatsAvailable)
+
+        return BatchResultForms(items=results, created=len(created))
+
+    @staticmethod
+    def _indexConferences(confs):
+        """Make new conferences searchable; a failed put is repaired by the
+        /tasks/index_conferences job."""
+        try:
+            searchindex.indexConferences(confs)
+        except search.Error:
+            logging.exception("Indexing %d conferences failed", len(confs))
+
+    @staticmethod
+    @ndb.tasklet
+    def _confirmConferencesAsync(user_id, email, conferenceInfos):
+        """Have the owner mailed about new conferences; the conferences of one
+        owner within a dispatch window go out in one mail."""
+        yield dispatch.addWorkAsync(dispatch.MAIL_QUEUE,
+            [(user_id, info) for info in conferenceInfos])
+        yield dispatch.coalesceAsync('confirmation-mail', user_id,
+            '/tasks/send_confirmation_email', {'userId': user_id, 'email': email})
+
+    def _checkBatchSize(self, items):
+        if not items:
+            raise endpoints.BadRequestException("No items given.")
+        if len(items) > BULK_MAX_ITEMS:
+            raise endpoints.BadRequestException(
+                "At most %d items per batch." % BULK_MAX_ITEMS)
+
+    def _putInChunks(self, pending, results, putChunkAsync=None,
+                     chunkSize=BULK_PUT_CHUNK):
+        """Store (index, entity) pairs with concurrent put_multi calls of
+        chunkSize entities, recording the key or the error of each item
+        in results; returns the stored entities.
+
+        putChunkAsync, if given, stores one chunk instead & returns a future
+        of its keys, e.g. to write more in the same transaction."""
+        chunks = []
+        for start in range(0, len(pending), chunkSize):
+            chunk = pending[start:start + chunkSize]
+            chunks.append((chunk, (putChunkAsync or self._putMultiAsync)(
+                [entity for i, entity in chunk])))
+        created = []
+        for chunk, future in chunks:
+            try:
+                keys = future.get_result()
+            except datastore_errors.Error as e:
+                # the entities of a chunk are sent in one RPC & fail together
+                for i, entity in chunk:
+                    results[i].error = str(e) or e.__class__.__name__
+                continue
+            for (i, entity), key in zip(chunk, keys):
+                results[i].websafeKey = key.urlsafe()
+                created.append(entity)
+        return created
+
+    @staticmethod
+    @ndb.tasklet
+    def _putMultiAsync(entities):
+        keys = yield ndb.put_multi_async(entities)
+        raise ndb.Return(keys)
+
     @endpoints.method(ConferenceQueryForms, ConferenceForms,
             path='queryConferences',
             http_method='POST',
             name='queryConferences')
     def queryConferences(self, request):
-        """Query for conferences."""
-        conferences = self._getQuery(request)
+        """Query for conferences, one page at a time."""
+        plan = self._copyPlan(CONFERENCE_PLAN, request.fields)
+        inequality_fields, filters = self._formatFilters(request.filters)
+
+        # the same filter combinations are asked all day; answer from the
+        # query cache when this page was computed in the current generation
+        cacheKey, cached = querycache.lookup('Conference', querycache.signature(
+            sorted(set((filtr["field"], filtr["operator"], self._filterValue(filtr))
+                       for filtr in filters)),
+            request.pageSize or DEFAULT_PAGE_SIZE, request.pageToken,
+            sorted(plan.fields or ()), request.text))
+        if cached is not None:
+            with tracing.serializing():
+                return protobuf.decode_message(ConferenceForms, cached)
+
+        if request.text:
+            # full text search, see searchindex.py
+            conferences, nextPageToken = self._searchConferences(request.text,
+                [(filtr["field"], filtr["operator"], self._filterValue(filtr))
+                 for filtr in filters], request)
+        elif len(inequality_fields) > 1 or (inequality_fields and any(
+                filtr["field"] == "dateRange" for filtr in filters)):
+            # the datastore allows inequalities on one field only, and no
+            # index holds dateBuckets with another property; let the query
+            # planner push the most selective filters & apply the rest
+            conferences, nextPageToken = self._fetchPlannedPage(Conference,
+                self._plannerFilters(filters), request)
+        else:
+            # run as a projection query if an index covers the requested fields
+            equalities = [filtr["field"] for filtr in filters if filtr["operator"] == "="]
+            orders = tuple(inequality_fields) + ('name',)
+            projection = self._projectionFor(plan, equalities, orders)
+
+            conferences, nextPageToken = self._fetchPage(self._getQuery(request),
+                                                         request, projection)
+            # buckets coarser than a day also match conferences just outside
+            # the range; such pages come out shorter
+            for filtr in filters:
+                if filtr["field"] == "dateRange":
+                    start, end = self._filterValue(filtr)
+                    conferences = [conf for conf in conferences
+                                   if datebuckets.overlaps(conf, start, end)]
+        forms = plan.copyAll(conferences)
+        if plan.fields is None or 'seatsAvailable' in plan.fields:
+            seats.applySeatsAvailable(conferences, forms)
 
         # return ConfrenceForms
-        return ConferenceForms(
-            items=[self._copyConferenceToForm(conf, "") \
-            for conf in conferences]
+        response = ConferenceForms(
+            items=forms,
+            nextPageToken=nextPageToken
+        )
+        with tracing.serializing():
+            querycache.store(cacheKey, protobuf.encode_message(response))
+        return response
+
+    @endpoints.method(message_types.VoidMessage, ConferenceFacetsForm,
+            path='conferenceFacets',
+            http_method='GET', name='getConferenceFacets')
+    def getConferenceFacets(self, request):
+        """Return the number of conferences per city, topic & month, with
+        seats available & in total, for the conference filters."""
+        counts = facets.getFacets()
+        single = lambda facet: counts.get(facet, {}).get('', 0)
+        return ConferenceFacetsForm(
+            cities=self._facetCountForms(counts.get(facets.CITY, {})),
+            topics=self._facetCountForms(counts.get(facets.TOPIC, {})),
+            # months in calendar order, the others by count
+            months=self._facetCountForms(counts.get(facets.MONTH, {}), key=int),
+            withSeats=single(facets.WITH_SEATS),
+            total=single(facets.TOTAL),
         )
 
-    @endpoints.method(message_types.VoidMessage, ConferenceForms,
+    @staticmethod
+    def _facetCountForms(values, key=None):
+        """Return FacetCountForms of {value: count}, most frequent first
+        unless ordered by key."""
+        if key is None:
+            items = sorted(values.items(), key=lambda item: (-item[1], item[0]))
+        else:
+            items = sorted(values.items(), key=lambda item: key(item[0]))
+        return [FacetCountForm(value=value, count=count) for value, count in items]
+
+    @endpoints.method(PAGE_GET_REQUEST, ConferenceForms,
         path='getConferencesCreated',
         http_method='POST', name='getConferencesCreated')
+    @ndb.synctasklet
     def getConferencesCreated(self, request):
         """Return conferences created by user."""
         # make sure user is authed
@@ -285,14 +570,17 @@ class ConferenceApi(remote.Service):
         # make profile key
         p_key = ndb.Key(Profile, getUserId(user))
         # create ancestor query for this user
-        conferences = Conference.query(ancestor=p_key)
-        # get the user profile and display name
-        prof = p_key.get()
+        q = Conference.query(ancestor=p_key)
+        # fetch the page and the user profile (for the display name) together
+        (conferences, nextPageToken), prof = yield (
+            self._fetchPageAsync(q, request), p_key.get_async())
         displayName = getattr(prof, 'displayName')
+        seats.applySeatsAvailable(conferences)
         # return set of ConferenceForm objects per Conference
-        return ConferenceForms(
-            items=[self._copyConferenceToForm(conf, displayName) for conf in conferences]
-        )
+        raise ndb.Return(ConferenceForms(
+            items=CONFERENCE_PLAN.copyAll(conferences, organizerDisplayName=displayName),
+            nextPageToken=nextPageToken
+        ))
 
     @endpoints.method(message_types.VoidMessage, ConferenceForms,
         path='filterPlayground',
@@ -321,61 +609,209 @@ class ConferenceApi(remote.Service):
 
         # Order Conferences on name
         q = q.order(Conference.name)
+        conferences = seats.applySeatsAvailable(q.fetch())
 
         # return set of ConferenceForm objects per Conference
         return ConferenceForms(
-            items=[self._copyConferenceToForm(conf, "") for conf in q]
+            items=CONFERENCE_PLAN.copyAll(conferences)
         )
 
     def _getQuery(self, request):
         """Return formatted query from the submitted filters."""
         q = Conference.query()
-        inequality_filter, filters = self._formatFilters(request.filters)
+        inequality_fields, filters = self._formatFilters(request.filters)
+        dateRange = any(filtr["field"] == "dateRange" for filtr in filters)
 
         # If exists, sort on inequality filter first
-        if not inequality_filter:
+        if dateRange:
+            # dateBuckets is in no composite index, where every conference
+            # would write a row per bucket (& topic); the built-in indexes
+            # serve it in key order only
+            pass
+        elif not inequality_fields:
             q = q.order(Conference.name)
         else:
-            q = q.order(ndb.GenericProperty(inequality_filter))
+            q = q.order(ndb.GenericProperty(inequality_fields[0]))
             q = q.order(Conference.name)
 
         for filtr in filters:
-            if filtr["field"] in ["month", "maxAttendees"]:
-                filtr["value"] = int(filtr["value"])
+            filtr["value"] = self._filterValue(filtr)
+            if filtr["field"] == "dateRange":
+                # overlapping a range needs inequalities on startDate & endDate;
+                # look up the date buckets of the range instead
+                try:
+                    buckets = datebuckets.rangeBuckets(*filtr["value"])
+                except ValueError as e:
+                    raise endpoints.BadRequestException(str(e))
+                q = q.filter(Conference.dateBuckets.IN(buckets))
+                continue
             formatted_query = ndb.query.FilterNode(filtr["field"], filtr["operator"], filtr["value"])
             q = q.filter(formatted_query)
+        if dateRange or any(filtr["operator"] == "!=" for filtr in filters):
+            # IN runs one query per bucket & != one per side of the value;
+            # their results can only be paged with cursors when ordered by key
+            q = q.order(Conference.key)
         return q
 
-    def _formatFilters(self, filters):
-        """Parse, check validity and format user supplied filters."""
+    def _filterValue(self, filtr):
+        """Return the filter value converted to the type of its property."""
+        if filtr["field"] in INTEGER_FIELDS:
+            try:
+                return int(filtr["value"])
+            except (TypeError, ValueError):
+                raise endpoints.BadRequestException(
+                    "Filter on %s needs a number." % filtr["field"])
+        if filtr["field"] == "dateRange":
+            try:
+                dates = [datetime.strptime(value.strip()[:10], "%Y-%m-%d").date()
+                         for value in (filtr["value"] or "").split("/")]
+            except ValueError:
+                dates = []
+            if len(dates) not in (1, 2) or dates[0] > dates[-1]:
+                raise endpoints.BadRequestException(
+                    "Filter on dateRange needs YYYY-MM-DD/YYYY-MM-DD dates.")
+            return (dates[0], dates[-1])
+        if filtr["field"] in DATE_FIELDS:
+            try:
+                return datetime.strptime((filtr["value"] or "")[:10], "%Y-%m-%d").date()
+            except ValueError:
+                raise endpoints.BadRequestException(
+                    "Filter on %s needs a YYYY-MM-DD date." % filtr["field"])
+        return filtr["value"]
+
+    def _formatFilters(self, filters, fields=FIELDS):
+        """Parse, check validity and format user supplied filters.
+
+        Returns the fields used with inequality filters & the formatted filters;
+        more than one inequality field needs the query planner."""
         formatted_filters = []
-        inequality_field = None
+        inequality_fields = []
 
         for f in filters:
             filtr = {field.name: getattr(f, field.name) for field in f.all_fields()}
 
             try:
-                filtr["field"] = FIELDS[filtr["field"]]
+                filtr["field"] = fields[filtr["field"]]
                 filtr["operator"] = OPERATORS[filtr["operator"]]
             except KeyError:
                 raise endpoints.BadRequestException("Filter contains invalid field or operator.")
+            if filtr["field"] == "dateRange" and filtr["operator"] != "=":
+                raise endpoints.BadRequestException("DATE_RANGE only supports EQ.")
 
             # Every operation except "=" is an inequality
-            if filtr["operator"] != "=":
-                # check if inequality operation has been used in previous filters
-                # disallow the filter if inequality was performed on a different field before
-                # track the field on which the inequality operation is performed
-                if inequality_field and inequality_field != filtr["field"]:
-                    raise endpoints.BadRequestException("Inequality filter is allowed on only one field.")
-                else:
-                    inequality_field = filtr["field"]
+            # track the fields on which the inequality operation is performed
+            if filtr["operator"] != "=" and filtr["field"] not in inequality_fields:
+                inequality_fields.append(filtr["field"])
 
             formatted_filters.append(filtr)
-        return (inequality_field, formatted_filters)
+        return (inequality_fields, formatted_filters)
+
+    def _plannerFilters(self, filters):
+        """Return (field, operator, value) filters for the query planner; a
+        date range becomes the inequalities of an overlap, which the planner
+        can apply in memory."""
+        planned = []
+        for filtr in filters:
+            value = self._filterValue(filtr)
+            if filtr["field"] == "dateRange":
+                planned.append(("startDate", "<=", value[1]))
+                planned.append(("endDate", ">=", value[0]))
+            else:
+                planned.append((filtr["field"], filtr["operator"], value))
+        return planned
+
+    def _copyPlan(self, plan, fields):
+        """Return the copy plan for the fields a client asked for (all if none)."""
+        if not fields:
+            return plan
+        try:
+            return plan.only(fields)
+        except ValueError as e:
+            raise endpoints.BadRequestException(str(e))
+
+    def _projectionFor(self, plan, equalities, orders):
+        """Return the projection covering the fields of a copy plan, or None if
+        no composite index in PROJECTION_INDEXES covers this query shape."""
+        if plan.fields is None:
+            return None
+        needed = set(plan.properties())
+        for prop in list(needed):
+            needed.update(FIELD_DEPENDENCIES.get(prop, ()))
+        kind = plan.model._get_kind()
+        for idxKind, idxEqualities, idxOrders, projected in PROJECTION_INDEXES:
+            if (idxKind == kind and set(idxEqualities) == set(equalities) and
+                    tuple(idxOrders) == tuple(orders) and needed <= set(projected)):
+                return projected
+        return None
+
+    def _searchConferences(self, text, filters, request):
+        """Fetch one page of the conferences matching text & filters from the
+        search index."""
+        try:
+            wscks, nextPageToken = searchindex.searchConferences(text, filters,
+                self._pageSize(request), request.pageToken)
+        except ValueError as e:
+            raise endpoints.BadRequestException(str(e))
+        except search.QueryError:
+            raise endpoints.BadRequestException("The search text cannot be parsed.")
+        # conferences deleted since they were indexed are skipped
+        conferences = [conf for conf in ndb.get_multi(
+            [ndb.Key(urlsafe=wsck) for wsck in wscks]) if conf]
+        return (conferences, nextPageToken)
+
+    def _fetchPage(self, query, request, projection=None, keys_only=False):
+        """Fetch one page of query results using the request's pageSize & pageToken."""
+        return self._fetchPageAsync(query, request, projection, keys_only).get_result()
+
+    def _fetchPlannedPage(self, model, filters, request):
+        """Fetch one page of a query the datastore cannot run as a whole,
+        filtering the candidates of the query planner in memory."""
+        pageSize, cursor = self._pageArgs(request)
+        results, nextCursor, more = queryplanner.plan(model, filters).fetchPage(
+            pageSize, cursor)
+        nextPageToken = None
+        if more and nextCursor:
+            nextPageToken = nextCursor.urlsafe()
+        return (results, nextPageToken)
+
+    @ndb.tasklet
+    def _fetchPageAsync(self, query, request, projection=None, keys_only=False):
+        """Tasklet version of _fetchPage, so the page fetch can overlap other RPCs."""
+        pageSize, cursor = self._pageArgs(request)
+        options = {'start_cursor': cursor}
+        if projection:
+            options['projection'] = projection
+        if keys_only:
+            options['keys_only'] = True
+        results, nextCursor, more = yield query.fetch_page_async(pageSize, **options)
+        nextPageToken = None
+        if more and nextCursor:
+            nextPageToken = nextCursor.urlsafe()
+        raise ndb.Return((results, nextPageToken))
+
+    def _pageSize(self, request):
+        """Return the checked page size of a paged request."""
+        pageSize = request.pageSize or DEFAULT_PAGE_SIZE
+        if pageSize < 1 or pageSize > MAX_PAGE_SIZE:
+            raise endpoints.BadRequestException(
+                "pageSize must be between 1 and %d." % MAX_PAGE_SIZE)
+        return pageSize
+
+    def _pageArgs(self, request):
+        """Return the page size & start cursor of a paged request."""
+        pageSize = self._pageSize(request)
+
+        # the page token is the opaque websafe cursor handed out by the previous page
+        cursor = None
+        if request.pageToken:
+            try:
+                cursor = ndb.Cursor(urlsafe=request.pageToken)
+            except (datastore_errors.BadValueError, datastore_errors.BadArgumentError):
+                raise endpoints.BadRequestException("Invalid pageToken.")
+        return (pageSize, cursor)
 
 # - - - Registration - - - - - - - - - - - - - - - - - - - -
 
-    @ndb.transactional(xg=True)
     def _conferenceRegistration(self, request, reg=True):
         """Register or unregister user for selected conference."""
         retval = None
@@ -389,38 +825,26 @@ class ConferenceApi(remote.Service):
         if not conf:
             raise endpoints.NotFoundException(
                 'No conference found with key: %s' % wsck)
-        # register
+        # register: take a seat from one of the conference's seat shards;
+        # raises ConflictException if already registered or sold out
         if reg:
-            # check if user already registered otherwise add
-            if wsck in prof.conferenceKeysToAttend:
+            # a key lookup answers the common repeated request
+            # without touching the seat shards
+            if registrations.isRegistered(prof, wsck):
                 raise ConflictException(
                     "You have already registered for this conference")
+            retval = seats.reserveSeat(conf, prof.key)
 
-            # check if seats avail
-            if conf.seatsAvailable <= 0:
-                raise ConflictException(
-                    "There are no seats available.")
-
-            # register user, take away one seat
-            prof.conferenceKeysToAttend.append(wsck)
-            conf.seatsAvailable -= 1
-            retval = True
-
-        # unregister
+        # unregister: give the seat back, False if user was not registered
+        elif not registrations.isRegistered(prof, wsck):
+            retval = False
         else:
-            # check if user already registered
-            if wsck in prof.conferenceKeysToAttend:
+            retval = seats.releaseSeat(conf, prof.key)
 
-                # unregister user, add back one seat
-                prof.conferenceKeysToAttend.remove(wsck)
-                conf.seatsAvailable += 1
-                retval = True
-            else:
-                retval = False
+        # cached conference queries show the old number of seats
+        if retval:
+            querycache.invalidate('Conference')
 
-        # write things back to the datastore & return
-        prof.put()
-        conf.put()
         return BooleanMessage(data=retval)
 
     @endpoints.method(CONF_GET_REQUEST, BooleanMessage,
@@ -439,48 +863,121 @@ class ConferenceApi(remote.Service):
 
 # - - - Query Conferences - - - - - - - - - - - - - - - - - - - -
 
+    @endpoints.method(message_types.VoidMessage, QueryCacheStatsForm,
+            path='conference/queryCacheStats',
+            http_method='GET', name='getQueryCacheStats')
+    def getQueryCacheStats(self, request):
+        """Return hit & miss counters of the queryConferences result cache."""
+        hits, misses, generation = querycache.getStats('Conference')
+        return QueryCacheStatsForm(kind='Conference', hits=hits,
+                                   misses=misses, generation=generation)
+
+    @endpoints.method(message_types.VoidMessage, DispatchStatsForm,
+            path='conference/dispatchStats',
+            http_method='GET', name='getDispatchStats')
+    def getDispatchStats(self, request):
+        """Return how many tasks of each coalesced type were queued & how many
+        were suppressed because a task of the same window was queued."""
+        items = []
+        for taskType in dispatch.TASK_TYPES:
+            queued, suppressed = dispatch.getStats(taskType)
+            items.append(DispatchStatForm(taskType=taskType, queued=queued,
+                                          suppressed=suppressed))
+        return DispatchStatsForm(items=items)
+
+    @staticmethod
+    def _traceStatForm(endpoint, totals):
+        """Return the per request averages of traced totals as TraceStatForm."""
+        requests = totals.get('requests', 0)
+        per = float(max(requests, 1))
+        rpcs = sorted(metric[len('rpc.'):] for metric in totals if metric.startswith('rpc.'))
+        return TraceStatForm(
+            endpoint=endpoint, requests=requests,
+            avgMs=totals.get('us', 0) / per / 1000,
+            avgSerializationMs=totals.get('serialization_us', 0) / per / 1000,
+            avgEntities=totals.get('entities', 0) / per,
+            rpcs=[RpcStatForm(call=call,
+                              perRequest=totals['rpc.' + call] / per,
+                              avgMs=totals.get('rpc_us.' + call, 0) / float(max(totals['rpc.' + call], 1)) / 1000)
+                  for call in rpcs])
+
+    @endpoints.method(message_types.VoidMessage, TraceStatsForm,
+            path='admin/traceStats',
+            http_method='GET', name='getTraceStats')
+    def getTraceStats(self, request):
+        """Return RPC counts & latencies of the traced requests, per endpoint &
+        task (admins only)."""
+        try:
+            isAdmin = oauth.is_current_user_admin(EMAIL_SCOPE)
+        except oauth.Error:
+            isAdmin = False
+        if not isAdmin:
+            raise endpoints.ForbiddenException('Admin access required')
+
+        recent = []
+        for trace in tracing.getRecent():
+            totals = {'requests': 1, 'us': trace.ms * 1000,
+                      'serialization_us': trace.serializationMs * 1000,
+                      'entities': trace.entities}
+            for call, count in trace.rpcs.items():
+                totals['rpc.' + call] = count
+                totals['rpc_us.' + call] = trace.rpcMs.get(call, 0.0) * 1000
+            recent.append(self._traceStatForm(trace.endpoint, totals))
+        return TraceStatsForm(
+            items=[self._traceStatForm(endpoint, totals)
+                   for endpoint, totals in sorted(tracing.getStats().items())],
+            recent=recent,
+            sampleRate=tracing.TRACE_SAMPLE_RATE)
+
     @endpoints.method(CONF_GET_REQUEST, ConferenceForm,
             path='conference/detail/{websafeConferenceKey}',
             http_method='GET', name='getConference')
+    @ndb.synctasklet
     def getConference(self, request):
         """Return requested conference (by websafeConferenceKey)."""
-        # get Conference object from request; bail if not found
-        conf = ndb.Key(urlsafe=request.websafeConferenceKey).get()
+        # the organizer Profile is the parent of the Conference key,
+        # so the conference & its organizer can be fetched together
+        c_key = ndb.Key(urlsafe=request.websafeConferenceKey)
+        conf, prof = yield c_key.get_async(), c_key.parent().get_async()
+        # bail if not found
         if not conf:
             raise endpoints.NotFoundException(
                 'No conference found with key: %s' % request.websafeConferenceKey)
-        prof = conf.key.parent().get()
+        seats.applySeatsAvailable([conf])
         # return ConferenceForm
-        return self._copyConferenceToForm(conf, getattr(prof, 'displayName'))
+        raise ndb.Return(self._copyConferenceToForm(conf, getattr(prof, 'displayName')))
 
     @endpoints.method(message_types.VoidMessage, ConferenceForms,
             path='conferences/attending',
             http_method='GET', name='getConferencesToAttend')
+    @ndb.synctasklet
     def getConferencesToAttend(self, request):
         """Get list of conferences that user has registered for."""
 
         prof = self._getProfileFromUser() # get user Profile
-        conf_keys = [ndb.Key(urlsafe=wsck) for wsck in prof.conferenceKeysToAttend]
-        conferences = ndb.get_multi(conf_keys)
+        conf_keys = [ndb.Key(urlsafe=wsck)
+                     for wsck in registrations.getConferenceKeysToAttend(prof)]
 
-        # get organizers
-        organisers = [ndb.Key(Profile, conf.organizerUserId) for conf in conferences]
-        profiles = ndb.get_multi(organisers)
+        # get conferences & their organizers together; the organizer
+        # Profile key is the parent of each Conference key
+        organisers = [conf_key.parent() for conf_key in conf_keys]
+        conferences, profiles = yield (ndb.get_multi_async(conf_keys),
+                                       ndb.get_multi_async(organisers))
 
         # put display names in a dict for easier fetching
         names = {}
         for profile in profiles:
             names[profile.key.id()] = profile.displayName
+        seats.applySeatsAvailable(conferences)
 
         # return set of ConferenceForm objects per Conference
-        return ConferenceForms(items=[self._copyConferenceToForm(conf, "")\
-         for conf in conferences]
-        )
+        raise ndb.Return(ConferenceForms(items=CONFERENCE_PLAN.copyAll(conferences)))
 
 # - - - Session Objects - - - - - - - - - - - - - - - - - - - -
 
     @endpoints.method(SessionForm, SessionForm, path='sesion',
                 http_method='POST', name='createSession')
+    @ndb.synctasklet
     def createSession(self, request):
         """Create new Session for a particular Conference."""
         
@@ -489,17 +986,39 @@ class ConferenceApi(remote.Service):
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
 
-        # Check if the conference exists
+        # Check if the Session name provided
+        if not request.name:
+            raise endpoints.BadRequestException("Session 'name' field required")
+
+        # Check if the conference exists; the new Session ID is allocated
+        # while the conference is being fetched
         wsck = request.webSafeConferenceKey
-        conf = ndb.Key(urlsafe=wsck).get()
+        c_key = ndb.Key(urlsafe=wsck)
+        conf, s_ids = yield (c_key.get_async(),
+                             Session.allocate_ids_async(size=1, parent=c_key))
         if not conf:
             raise endpoints.NotFoundException(
                 'No conference found with key: %s' % wsck)
 
-        # Check if the Session name provided
-        if not request.name:
-            raise endpoints.BadRequestException("Session 'name' field required")
+        data = self._sessionData(request, conf)
+
+        # make session key from the ID allocated with the Conference key as
+        # parent, so the sessions of a conference are one entity group
+        s_key = ndb.Key(Session, s_ids[0], parent=c_key)
+        data['key'] = s_key
+        # Store the session, then hand it to the tasks which add it to the
+        # speaker tally of this conference & update the featured speaker in
+        # memcache, and rebuild the conference schedule. The tasks must not
+        # see a session whose put failed.
+        yield Session(**data).put_async()
+        yield self._sessionsCreatedAsync({request.webSafeConferenceKey:
+            [(data['speaker'], s_key.urlsafe(), data['name'])]})
+        
+        raise ndb.Return(request)
 
+    def _sessionData(self, request, conf):
+        """Copy a SessionForm into Session properties of conf, filling in
+        defaults (in the form as well); raises ValueError for a malformed date."""
         # copy SessionForm/ProtoRPC Message into dict
         data = {field.name: getattr(request, field.name) for field in request.all_fields()}
         # Delete the sesison Key property coming from SessionForm
@@ -515,69 +1034,140 @@ class ConferenceApi(remote.Service):
             data['date'] = datetime.strptime(data['date'][:10], "%Y-%m-%d").date()
         else:
             data['date'] = conf.startDate
-
-        # allocate new Session ID with Conference key as parent
-        c_id = conf.key.id()
-        c_key = ndb.Key(Conference, c_id)
-        s_id = Session.allocate_ids(size=1, parent=c_key)[0]
-        # make session key from ID
-        s_key = ndb.Key(Session, s_id, parent=c_key)
-        data['key'] = s_key
         data['webSafeConferenceKey'] = request.webSafeConferenceKey
-        Session(**data).put()
-        # Add a task which will identify featured speaker & add it to memcache 
-        # if this speaker has many sessions in this conference
-        taskqueue.add(params={'speaker': data['speaker'],
-            'confId': request.webSafeConferenceKey},
-            url='/tasks/identify_featured_speaker'
-        )
-        
-        return request
+        return data
 
-    @endpoints.method(CONF_GET_REQUEST, SessionForms, path='allSesions/{websafeConferenceKey}',
+    @endpoints.method(SessionForms, BatchResultForms, path='sessions/batch',
+                http_method='POST', name='createSessions')
+    def createSessions(self, request):
+        """Create many Sessions, of one or more Conferences, reporting the
+        outcome of every item."""
+        # make sure user is authed
+        user = endpoints.get_current_user()
+        if not user:
+            raise endpoints.UnauthorizedException('Authorization required')
+        self._checkBatchSize(request.items)
+        results = [BatchResultForm(index=i) for i in range(len(request.items))]
+
+        # group the items by conference
+        byConference = {}
+        for i, form in enumerate(request.items):
+            if not form.name:
+                results[i].error = "Session 'name' field required"
+                continue
+            try:
+                c_key = ndb.Key(urlsafe=form.webSafeConferenceKey)
+            except Exception:
+                # ndb raises several error types for malformed keys
+                c_key = None
+            if not c_key or c_key.kind() != 'Conference':
+                results[i].error = "Invalid webSafeConferenceKey."
+                continue
+            byConference.setdefault(c_key, []).append((i, form))
+
+        # fetch the conferences & allocate one id range per conference together
+        c_keys = byConference.keys()
+        confFutures = ndb.get_multi_async(c_keys)
+        idFutures = [Session.allocate_ids_async(size=len(byConference[c_key]), parent=c_key)
+                     for c_key in c_keys]
+        pending = []
+        for c_key, confFuture, idFuture in zip(c_keys, confFutures, idFutures):
+            conf = confFuture.get_result()
+            start, end = idFuture.get_result()
+            for s_id, (i, form) in zip(range(start, end + 1), byConference[c_key]):
+                if not conf:
+                    results[i].error = 'No conference found with key: %s' % form.webSafeConferenceKey
+                    continue
+                try:
+                    data = self._sessionData(form, conf)
+                except ValueError:
+                    results[i].error = "Session 'date' must be YYYY-MM-DD."
+                    continue
+                data['key'] = ndb.Key(Session, s_id, parent=c_key)
+                pending.append((i, Session(**data)))
+        created = self._putInChunks(pending, results)
+
+        # one follow-up task per conference updates the featured speaker, the
+        # speakers & the schedule
+        byConference = {}
+        for sess in created:
+            byConference.setdefault(sess.webSafeConferenceKey, []).append(
+                (sess.speaker, sess.key.urlsafe(), sess.name))
+        self._sessionsCreatedAsync(byConference).get_result()
+
+        return BatchResultForms(items=results, created=len(created))
+
+    @staticmethod
+    @ndb.tasklet
+    def _sessionsCreatedAsync(byConference):
+        """Hand new (speaker, websafe session key, name) sessions, by websafe
+        conference key, to the featured speaker & schedule tasks; call it only
+        once the sessions are stored.
+
+        Both tasks are coalesced per conference, so a burst of new sessions
+        is handled by one run of each."""
+        yield dispatch.addWorkAsync(dispatch.SPEAKER_QUEUE, byConference.items())
+        yield (dispatch.coalesceMultiAsync('featured-speaker',
+                   [(wsck, {'confId': wsck}) for wsck in byConference],
+                   '/tasks/identify_featured_speaker'),
+               schedules.schedulesChangedAsync(byConference.keys()))
+        # the speaker directories are rebuilt on their next read; the lock
+        # keeps a read that started before the put from caching its old copy
+        memcache.delete_multi([MEMCACHE_SPEAKERS_KEY % wsck for wsck in byConference],
+                              seconds=SPEAKERS_CACHE_LOCK_TIME)
+
+    @endpoints.method(CONF_SESSIONS_GET_REQUEST, SessionForms, path='allSesions/{websafeConferenceKey}',
                     http_method='GET', name='getConferenceSessions')
     def getConferenceSessions(self, request):
-        """Return sessions under this conf key."""
+        """Return sessions under this conf key.
+
+        Without pageSize, pageToken & fields the whole precomputed schedule is
+        returned, sorted by date & startTime, with its version."""
         # make sure user is authed
         user = endpoints.get_current_user()
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
-        s = Session.query()
-        # get the sessions of this conference
-        field = "webSafeConferenceKey"
-        operator = "="
-        value = request.websafeConferenceKey
-        f = ndb.query.FilterNode(field, operator, value)
-        s = s.filter(f)
+        if not (request.pageSize or request.pageToken or request.fields):
+            return schedules.getSchedule(request.websafeConferenceKey)
+        # get the sessions of this conference; an ancestor query is
+        # strongly consistent
+        s = Session.query(ancestor=self._websafeKey(
+            request.websafeConferenceKey, Conference, 'websafeConferenceKey'))
+        plan = self._copyPlan(SESSION_PLAN, request.fields)
+        projection = self._projectionFor(plan, [ANCESTOR], ())
+        sessions, nextPageToken = self._fetchPage(s, request, projection)
         # return set of SessionForm objects per Session
         return SessionForms(
-            items=[self._copySessionToForm(ses) for ses in s]
-            
+            items=plan.copyAll(sessions),
+            nextPageToken=nextPageToken
         )
 
     def _copySessionToForm(self, ses):
         """Copy relevant fields from Session to SessionForm."""
-        sf = SessionForm()
-        for field in sf.all_fields():
-            if hasattr(ses, field.name):
-            # convert Date to date string; just copy others
-                if field.name.endswith('date'):
-                    setattr(sf, field.name, str(getattr(ses, field.name)))
-                else:
-                    setattr(sf, field.name, getattr(ses, field.name))
-            elif field.name == "sessionKey":
-                setattr(sf, field.name, ses.key.urlsafe())
-        sf.check_initialized()
-        return sf   
+        return SESSION_PLAN.copy(ses)
     
     @endpoints.method(SPEAKER_GET_REQUEST, SessionForms, path='speakerSesions/{speaker}',
                     http_method='GET', name='getSessionsBySpeaker')
     def getSessionsBySpeaker(self, request):
-        """Return sessions by this speaker."""
+        """Return sessions by this speaker, whatever the case & spacing of the name."""
         # make sure user is authed
         user = endpoints.get_current_user()
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
+        plan = self._copyPlan(SESSION_PLAN, request.fields)
+
+        # a keys only query of the speaker's sessions & a batch get of one page of them
+        speakerQuery = speakers.speakerQuery(request.speaker)
+        if speakerQuery.get(keys_only=True):
+            keys, nextPageToken = self._fetchPage(speakerQuery, request, keys_only=True)
+            sessions = ndb.get_multi([ndb.Key(urlsafe=speakers.sessionKeyOf(key))
+                                      for key in keys])
+            return SessionForms(
+                items=plan.copyAll([sess for sess in sessions if sess]),
+                nextPageToken=nextPageToken
+            )
+
+        # speakers not indexed yet (see /tasks/backfill_speakers)
         s = Session.query()
         # Look for the sessions by this speaker
         field = "speaker"
@@ -585,10 +1175,12 @@ class ConferenceApi(remote.Service):
         value = request.speaker
         f = ndb.query.FilterNode(field, operator, value)
         s = s.filter(f)
+        projection = self._projectionFor(plan, [field], ())
+        sessions, nextPageToken = self._fetchPage(s, request, projection)
         # return set of SessionForm objects per Session
         return SessionForms(
-            items=[self._copySessionToForm(ses) for ses in s]
-            
+            items=plan.copyAll(sessions),
+            nextPageToken=nextPageToken
         )
 
     @endpoints.method(CONF_SESSION_TYPE_GET_REQUEST, SessionForms, path='getConferenceSessionsByType/{typeOfSession}/{websafeConferenceKey}',
@@ -599,13 +1191,9 @@ class ConferenceApi(remote.Service):
         user = endpoints.get_current_user()
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
-        s = Session.query()
         # Look for sessions under this particular conference
-        field = "webSafeConferenceKey"
-        operator = "="
-        value = request.websafeConferenceKey
-        f = ndb.query.FilterNode(field, operator, value)
-        s = s.filter(f)
+        s = Session.query(ancestor=self._websafeKey(
+            request.websafeConferenceKey, Conference, 'websafeConferenceKey'))
         # Look for sessions under this type
         field = "typeOfSession"
         operator = "="
@@ -614,14 +1202,93 @@ class ConferenceApi(remote.Service):
         s = s.filter(f)
         # return set of SessionForm objects per Session
         return SessionForms(
-            items=[self._copySessionToForm(ses) for ses in s]
+            items=SESSION_PLAN.copyAll(s)
             
         )
 
+    def _formatSessionOrders(self, orderBy):
+        """Return the (property, descending) sort orders of a session query."""
+        orders = []
+        for name in orderBy:
+            descending = name.startswith('-')
+            try:
+                orders.append((SESSION_FIELDS[name.lstrip('-')], descending))
+            except KeyError:
+                raise endpoints.BadRequestException("Invalid orderBy field: %s" % name)
+        return orders
+
+    def _getSessionQuery(self, filters, inequality_fields, orders):
+        """Return the datastore query for formatted session filters & orders."""
+        q = Session.query()
+        for filtr in filters:
+            q = q.filter(ndb.query.FilterNode(
+                filtr["field"], filtr["operator"], self._filterValue(filtr)))
+
+        # index.yaml holds all ascending & all descending sort orders only
+        if len(set(descending for prop, descending in orders)) > 1:
+            raise endpoints.BadRequestException(
+                "orderBy fields must all be ascending or all descending.")
+        # the datastore needs the inequality property as the first sort order
+        if inequality_fields and (not orders or orders[0][0] != inequality_fields[0]):
+            descending = orders[0][1] if orders else False
+            orders = [(inequality_fields[0], descending)] + orders
+        for prop, descending in orders:
+            order = ndb.GenericProperty(prop)
+            q = q.order(-order if descending else order)
+        if any(filtr["operator"] == "!=" for filtr in filters):
+            # != runs as two queries, which can only be paged with cursors
+            # when ordered by key
+            q = q.order(Session.key)
+        return q
+
+    @endpoints.method(SessionQueryForms, SessionForms,
+            path='queryConferenceSessions',
+            http_method='POST',
+            name='queryConferenceSessions')
+    def queryConferenceSessions(self, request):
+        """Query for sessions by conference, speaker, type, date, startTime or
+        duration, sorted & one page at a time."""
+        # make sure user is authed
+        user = endpoints.get_current_user()
+        if not user:
+            raise endpoints.UnauthorizedException('Authorization required')
+
+        plan = self._copyPlan(SESSION_PLAN, request.fields)
+        inequality_fields, filters = self._formatFilters(request.filters, SESSION_FIELDS)
+        orders = self._formatSessionOrders(request.orderBy)
+
+        if len(inequality_fields) > 1:
+            # the planner streams candidates in index order, so it cannot sort
+            if orders:
+                raise endpoints.BadRequestException(
+                    "orderBy needs inequality filters on one field at most.")
+            sessions, nextPageToken = self._fetchPlannedPage(Session,
+                [(filtr["field"], filtr["operator"], self._filterValue(filtr))
+                 for filtr in filters], request)
+        else:
+            equalities = [filtr["field"] for filtr in filters if filtr["operator"] == "="]
+            projection = None
+            if not inequality_fields:
+                projection = self._projectionFor(
+                    plan, equalities, tuple(prop for prop, descending in orders))
+            q = self._getSessionQuery(filters, inequality_fields, orders)
+            try:
+                sessions, nextPageToken = self._fetchPage(q, request, projection)
+            except datastore_errors.NeedIndexError:
+                raise endpoints.BadRequestException(
+                    "No index serves this combination of filters & orderBy.")
+
+        # return set of SessionForm objects per Session
+        return SessionForms(
+            items=plan.copyAll(sessions),
+            nextPageToken=nextPageToken
+        )
+
 # - - - WishList Objects - - - - - - - - - - - - - - - - - - - -
 
     @endpoints.method(WISHLIST_GET_REQUEST, WishListForm, path='addSessionToWishlist/{sessionKey}',
                         http_method='GET', name='addSessionToWishlist')
+    @ndb.synctasklet
     def addSessionToWishlist(self, request):
         """Add particular Session to users wishlist"""
         # make sure user is authed
@@ -629,34 +1296,32 @@ class ConferenceApi(remote.Service):
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
                
-        # make sure session Key is provided
-        if not request.sessionKey:
-            raise endpoints.BadRequestException("Session 'key' field required")
+        # make sure a valid session Key is provided
+        s_key = self._websafeKey(request.sessionKey, Session, 'sessionKey')
 
         # make sure the session Key provided is already there in datastore
+        # & check if the user has already added this session in wishlist earlier;
+        # both lookups run concurrently
         skey = request.sessionKey
-        sess = ndb.Key(urlsafe=skey).get()
+        userID = getUserId(user)
+        w_key = self._wishListKey(userID, skey)
+        sess, w = yield (s_key.get_async(), w_key.get_async())
         if not sess:
             raise endpoints.NotFoundException(
-                'No Session found with key: %s' % sess)
-
-        # Check if the user has already added this session in wishlist earlier
-        userID = getUserId(user)
-        w = WishList.query(ndb.AND(
-            WishList.userId == userID,
-            WishList.sessionKey == request.sessionKey)
-        ).fetch()
+                'No Session found with key: %s' % skey)
         if w:
             raise ConflictException("You have already added this session to wishlist")
 
         # copy WishListForm/ProtoRPC Message into dict
         data= {}
        
+        data['key'] = w_key
         data['userId'] = userID
         data['sessionKey'] = request.sessionKey
         
-        #  Store the data in data store
-        WishList(**data).put()
+        #  Store the data in data store; the transaction re-checks the key
+        #  so concurrent adds of the same session cannot both succeed
+        yield self._insertWishListAsync(WishList(**data))
 
         # return WishListForm
         wlf = WishListForm()
@@ -664,7 +1329,7 @@ class ConferenceApi(remote.Service):
         wlf.sessionKey = request.sessionKey
         wlf.check_initialized()
 
-        return wlf  
+        raise ndb.Return(wlf)
 
     @endpoints.method(message_types.VoidMessage, WishListForms, path='getSessionsInWishlist',
                         http_method='GET', name='getSessionsInWishlist')
@@ -675,24 +1340,19 @@ class ConferenceApi(remote.Service):
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
 
-        # get users wishlist
+        # get users wishlist; entries are children of the user's Profile key
         userID = getUserId(user)
-        wishLists = WishList.query(WishList.userId == userID).fetch()
+        wishLists = WishList.query(ancestor=ndb.Key(Profile, userID)).fetch()
         
         # Return wishlistforms
         return WishListForms(
-            items=[self._copyWishListToForm(w) for w in wishLists]
+            items=WISHLIST_PLAN.copyAll(wishLists)
             
         )
 
     def _copyWishListToForm(self, w):
         """Copy relevant fields from WishList to WishListForm."""
-        wf = WishListForm()
-        for field in wf.all_fields():
-            setattr(wf, field.name, getattr(w, field.name))
-
-        wf.check_initialized()
-        return wf   
+        return WISHLIST_PLAN.copy(w)
 
 
     @endpoints.method(WISHLIST_GET_REQUEST, BooleanMessage, path='deleteSessionInWishlist/{sessionKey}',
@@ -704,115 +1364,251 @@ class ConferenceApi(remote.Service):
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
 
-        # Get the session of this user from wishlist
+        # Delete the session of this user from wishlist, by its key
+        self._websafeKey(request.sessionKey, Session, 'sessionKey')
         userID = getUserId(user)
-        w = WishList.query(ndb.AND(
-            WishList.userId == userID,
-            WishList.sessionKey == request.sessionKey)
-        ).fetch()        
-        retval = True
+        retval = self._deleteWishList(self._wishListKey(userID, request.sessionKey))
         # Check if the session which is asked to delate exists or not
-        if not w:
+        if not retval:
             raise ConflictException("You dont have this session in the wishlist")
-            retval=False
-        else:
-            # if session exists then delete from wishlist
-            for tmp in w:
-                tmp.key.delete()
-            retval=True
 
         return BooleanMessage(data=retval)
 
+    @staticmethod
+    def _websafeKey(websafeKey, model, name):
+        """Return the key of a websafe key given in a request, raising
+        BadRequestException if it is missing, malformed or of another kind."""
+        if not websafeKey:
+            raise endpoints.BadRequestException("%s is required." % name)
+        try:
+            key = ndb.Key(urlsafe=websafeKey)
+        except (TypeError, ValueError, ProtocolBufferDecodeError,
+                datastore_errors.Error):
+            raise endpoints.BadRequestException("Invalid %s: %s" % (name, websafeKey))
+        if key.kind() != model._get_kind():
+            raise endpoints.BadRequestException("Invalid %s: %s" % (name, websafeKey))
+        return key
+
+    @staticmethod
+    def _wishListKey(userID, sessionKey):
+        """Return the WishList key of a session, parented by the user's Profile."""
+        return ndb.Key(Profile, userID, WishList, sessionKey)
+
+    @staticmethod
+    @ndb.transactional_tasklet
+    def _insertWishListAsync(wishList):
+        """Store a WishList entry unless its key is already taken."""
+        existing = yield wishList.key.get_async()
+        if existing:
+            raise ConflictException("You have already added this session to wishlist")
+        yield wishList.put_async()
+
+    @staticmethod
+    @ndb.transactional
+    def _deleteWishList(w_key):
+        """Delete a WishList entry; return False if it did not exist."""
+        if not w_key.get():
+            return False
+        w_key.delete()
+        return True
+
+    @staticmethod
+    def _migrateWishLists(cursor=None):
+        """Re-key one batch of old WishList entities under their user's Profile.
+
+        Returns the cursor of the next batch or None when the migration is done."""
+        q = WishList.query()
+        if cursor:
+            cursor = ndb.Cursor(urlsafe=cursor)
+        wishLists, nextCursor, more = q.fetch_page(WISHLIST_MIGRATION_BATCH,
+                                                   start_cursor=cursor)
+        # old entities are root entities with a datastore-assigned id
+        old = [w for w in wishLists if w.key.parent() is None]
+        new = [WishList(key=ConferenceApi._wishListKey(w.userId, w.sessionKey),
+                        userId=w.userId, sessionKey=w.sessionKey) for w in old]
+        ndb.put_multi(new)
+        ndb.delete_multi([w.key for w in old])
+        if more and nextCursor:
+            return nextCursor.urlsafe()
+        return None
+
+    @staticmethod
+    def _migrateSessions(cursor=None):
+        """Re-parent one batch of old Session entities under their Conference key.
+
+        The wishlist entries & speaker tally entries of a moved session follow
+        its new key. Returns the cursor of the next batch or None when done."""
+        q = Session.query()
+        if cursor:
+            cursor = ndb.Cursor(urlsafe=cursor)
+        sessions, nextCursor, more = q.fetch_page(SESSION_MIGRATION_BATCH,
+                                                  start_cursor=cursor)
+        # old sessions hang off a Conference key without its Profile parent
+        moved = set()
+        for sess in sessions:
+            try:
+                c_key = ConferenceApi._websafeKey(
+                    sess.webSafeConferenceKey, Conference, 'webSafeConferenceKey')
+            except endpoints.BadRequestException as e:
+                # raising would retry the batch forever; the session stays where it is
+                logging.warning('Session %s not moved: %s', sess.key.urlsafe(), e)
+                continue
+            if sess.key.parent() != c_key:
+                ConferenceApi._moveSession(sess, c_key)
+                moved.add(sess.webSafeConferenceKey)
+        # the schedules of these conferences now see the moved sessions
+        schedules.schedulesChangedAsync(moved).get_result()
+        if more and nextCursor:
+            return nextCursor.urlsafe()
+        return None
+
+    @staticmethod
+    def _moveSession(sess, c_key):
+        """Copy a Session under c_key, re-key its references & delete the old one.
+
+        The copy keeps the old id, so a retried task writes the same entity
+        again instead of a duplicate."""
+        if sess.key.parent() == c_key:
+            return
+        s_key = ndb.Key(Session, sess.key.id(), parent=c_key)
+        data = sess.to_dict()
+        Session(key=s_key, **data).put()
+
+        oldKey, newKey = sess.key.urlsafe(), s_key.urlsafe()
+        wishLists = WishList.query(WishList.sessionKey == oldKey).fetch()
+        ndb.put_multi([WishList(key=ConferenceApi._wishListKey(w.userId, newKey),
+                                userId=w.userId, sessionKey=newKey)
+                       for w in wishLists])
+        ndb.delete_multi([w.key for w in wishLists])
+
+        @ndb.transactional
+        def _renameTallySession():
+            tally = ndb.Key(SpeakerTally, sess.webSafeConferenceKey).get()
+            sessions = tally and (tally.speakers or {}).get(sess.speaker)
+            if sessions and oldKey in sessions:
+                sessions[newKey] = sessions.pop(oldKey)
+                tally.put()
+        _renameTallySession()
+        speakers.renameSession(sess.speaker, oldKey, newKey)
+        sess.key.delete()
+
 # - - - Memcache Additions - - - - - - - - - - - - - - - - - - - -
 
 
     @staticmethod
     def _cacheAnnouncement():
-        """Create Announcement of conferences whose seats left are less then 5 & assign to memcache"""
-        confs = Conference.query(ndb.AND(
-            Conference.seatsAvailable <= 5,
-            Conference.seatsAvailable > 0)
-        ).fetch(projection=[Conference.name])
-
-        if confs:
-            # If there are almost sold out conferences,
-            # format announcement and set it in memcache
-            announcement = '%s %s' % (
-                'Last chance to attend! The following conferences '
-                'are nearly sold out:',
-                ', '.join(conf.name for conf in confs))
-            memcache.set(MEMCACHE_ANNOUNCEMENTS_KEY, announcement)
-        else:
-            # If there are no sold out conferences,
-            # delete the memcache announcements entry
-            announcement = ""
-            memcache.delete(MEMCACHE_ANNOUNCEMENTS_KEY)
-
-        return announcement
+        """Check the cached Announcement of conferences whose seats left are less then 5
+        against the datastore & repair it; registrations keep it up to date in between"""
+        return announcements.rebuildAnnouncement()
 
     @staticmethod
-    def _identifyFeatureSpeaker(speaker,confId):
-        """identify featured speaker of a particular conference & assign to memcache"""
-        sessions = Session.query(ndb.AND(
-            Session.webSafeConferenceKey == confId,
-            Session.speaker == speaker)
-        ).fetch(projection=[Session.name])
-
-        if sessions:
-            # If there are almost sold out conferences,
-            # format announcement and set it in memcache
-            featuredSpeaker = '%s %s %s' % (
-                speaker,'has the following sessions --------',','.join(session.name for session in sessions))
-            memcache.set(MEMCACHE_FEATURED_SPEAKER_KEY, featuredSpeaker)
-        else:
-            # If there are no sold out conferences,
-            # delete the memcache announcements entry
-            featuredSpeaker = ""
-            memcache.delete(MEMCACHE_FEATURED_SPEAKER_KEY)
-        
-        return featuredSpeaker
+    @ndb.transactional(xg=True)
+    def _identifyFeatureSpeaker(confId, newSessions):
+        """Add new (speaker, websafe session key, session name) sessions to the
+        speaker tally of their conference & update the featured speaker of
+        that conference in memcache"""
+        t_key = ndb.Key(SpeakerTally, confId)
+        tally = t_key.get()
+        if tally is None:
+            # conference created before the tally existed: count the sessions
+            # it already has first; the new ones are among them by now
+            tally = SpeakerTally(key=t_key, speakers={})
+            existing = Session.query(ancestor=ndb.Key(urlsafe=confId)).fetch()
+            newSessions = [(sess.speaker, sess.key.urlsafe(), sess.name)
+                           for sess in existing] + list(newSessions)
+        speakers = tally.speakers or {}
+
+        for speaker, sessionKey, sessionName in newSessions:
+            # keyed by session, so a retried task does not count a session twice
+            sessions = speakers.setdefault(speaker, {})
+            sessions[sessionKey] = sessionName
+
+            # the speaker with the most sessions is featured; the speaker of the
+            # newest session wins a tie
+            featured = tally.featuredSpeaker
+            if not featured or len(sessions) >= len(speakers.get(featured, {})):
+                tally.featuredSpeaker = speaker
+                tally.announcement = '%s %s %s' % (
+                    speaker,'has the following sessions --------',','.join(sorted(sessions.values())))
+
+        tally.speakers = speakers
+        tally.put()
+        # memcache is only updated once the tally is committed
+        ndb.get_context().call_on_commit(lambda: memcache.set(
+            MEMCACHE_FEATURED_SPEAKER_KEY % confId, tally.announcement))
+        return tally.announcement
 
     @endpoints.method(message_types.VoidMessage, StringMessage,
             path='conference/announcement/get',
             http_method='GET', name='getAnnouncement')
     def getAnnouncement(self, request):
         """Return Announcement from memcache."""
-        # return an existing announcement from Memcache or an empty string.
-        announcement = memcache.get(MEMCACHE_ANNOUNCEMENTS_KEY)
-        if not announcement:
-            announcement = ""
-        return StringMessage(data=announcement)
+        # return the announcement, reloaded into Memcache if it was evicted
+        return StringMessage(data=announcements.getAnnouncement())
 
 
-    @endpoints.method(message_types.VoidMessage, StringMessage,
-            path='conference/getFeaturedSpeaker',
+    @endpoints.method(CONF_GET_REQUEST, StringMessage,
+            path='conference/getFeaturedSpeaker/{websafeConferenceKey}',
             http_method='GET', name='getFeaturedSpeaker')
     def getFeaturedSpeaker(self, request):
-        """Return featured speaker from memcache."""
-        # return a featured speaker from Memcache or an empty string.
-        featuredSpeaker = memcache.get(MEMCACHE_FEATURED_SPEAKER_KEY)
-        if not featuredSpeaker:
-            featuredSpeaker = "" 
+        """Return featured speaker of this conference from memcache."""
+        wsck = request.websafeConferenceKey
+        featuredSpeaker = memcache.get(MEMCACHE_FEATURED_SPEAKER_KEY % wsck)
+        if featuredSpeaker is None:
+            # evicted from memcache; reload from the durable tally by key
+            tally = ndb.Key(SpeakerTally, wsck).get()
+            featuredSpeaker = (tally and tally.announcement) or ""
+            memcache.add(MEMCACHE_FEATURED_SPEAKER_KEY % wsck, featuredSpeaker)
+        # return a featured speaker or an empty string.
         return StringMessage(data=featuredSpeaker)
 
 # - - - Endpoints for Indexes Queries - - - - - - - - - - - - - - - - - - - -
 
-    @endpoints.method(CONF_GET_REQUEST, StringMessage, path='getConferenceSpeakers/{websafeConferenceKey}',
+    @staticmethod
+    def _getSpeakerDirectory(wsck):
+        """Return the sorted (speaker, session count) list of a conference,
+        cached until a session is added."""
+        directory = memcache.get(MEMCACHE_SPEAKERS_KEY % wsck)
+        if directory is None:
+            # the projection query reads just the speaker index entries
+            sessions = Session.query(ancestor=ndb.Key(urlsafe=wsck)
+                                     ).fetch(projection=[Session.speaker])
+            counts = {}
+            for session in sessions:
+                counts[session.speaker] = counts.get(session.speaker, 0) + 1
+            directory = sorted(counts.items())
+            # add, not set: fails while a new session has the key locked
+            memcache.add(MEMCACHE_SPEAKERS_KEY % wsck, directory, time=SPEAKERS_CACHE_TIME)
+        return directory
+
+    @endpoints.method(CONF_PAGE_GET_REQUEST, SpeakerForms, path='getConferenceSpeakers/{websafeConferenceKey}',
                         http_method='GET', name='getConferenceSpeakers')
     def getConferenceSpeakers(self, request):
-        """Return all the Speakers under this Conference."""
+        """Return the Speakers under this Conference with their number of
+        sessions, one page at a time."""
         # make sure user is authed
         user = endpoints.get_current_user()
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
 
-        # get sessions of this conference
-        sessions = Session.query(Session.webSafeConferenceKey == request.websafeConferenceKey).fetch()
-        speakers = ' %s %s' % (
-                'The speakers of the selected conference are --------',','.join(session.speaker for session in sessions))
-        
+        pageSize = self._pageSize(request)
+        directory = self._getSpeakerDirectory(request.websafeConferenceKey)
+        # the page token is the last speaker of the previous page, so pages
+        # stay in step while speakers are added
+        start = 0
+        if request.pageToken:
+            start = bisect.bisect_right(directory, (request.pageToken, sys.maxint))
+        page = directory[start:start + pageSize]
+        nextPageToken = None
+        if start + pageSize < len(directory):
+            nextPageToken = page[-1][0]
+
         # Return Speaker List
-        return StringMessage(data=speakers)
+        return SpeakerForms(
+            items=[SpeakerForm(speaker=speaker, sessionCount=count)
+                   for speaker, count in page],
+            nextPageToken=nextPageToken
+        )
 
     @endpoints.method(CONF_GET_REQUEST, StringMessage, path='getConferenceRegisterdUsers/{websafeConferenceKey}',
                         http_method='GET', name='getConferenceRegisterdUsers')
@@ -823,15 +1619,46 @@ class ConferenceApi(remote.Service):
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
 
-        # get users who has this conference in their attend list OR in other words have registered to
-        profiles = Profile.query(Profile.conferenceKeysToAttend == request.websafeConferenceKey).fetch()
+        # get users who have registered to this conference; the Profile
+        # keys are the parents of the Registration keys
+        r_keys = registrations.attendeesQuery(request.websafeConferenceKey).fetch(keys_only=True)
+        profiles = ndb.get_multi([r_key.parent() for r_key in r_keys])
         users = ' %s %s' % (
-                'The Users registered for the selected conference are --------',','.join(user.displayName for user in profiles))
+                'The Users registered for the selected conference are --------',','.join(user.displayName for user in profiles if user))
         
         # Return users List
         return StringMessage(data=users)
 
-    @endpoints.method(message_types.VoidMessage, StringMessage, path='getFilteredSessions',
+    @endpoints.method(CONF_PAGE_GET_REQUEST, AttendeeForms, path='getConferenceAttendees/{websafeConferenceKey}',
+                        http_method='GET', name='getConferenceAttendees')
+    @ndb.synctasklet
+    def getConferenceAttendees(self, request):
+        """Return one page of the display names of the users registered for
+        this Conference & the number of all of them."""
+        # make sure user is authed
+        user = endpoints.get_current_user()
+        if not user:
+            raise endpoints.UnauthorizedException('Authorization required')
+
+        # page through the Registration keys & fetch the conference for the
+        # attendee count together
+        wsck = request.websafeConferenceKey
+        (r_keys, nextPageToken), conf = yield (
+            self._fetchPageAsync(registrations.attendeesQuery(wsck), request, keys_only=True),
+            ndb.Key(urlsafe=wsck).get_async())
+        if not conf:
+            raise endpoints.NotFoundException(
+                'No conference found with key: %s' % wsck)
+        # one batch get; Profiles are mostly served from ndb's caches
+        profiles = yield ndb.get_multi_async([r_key.parent() for r_key in r_keys])
+
+        raise ndb.Return(AttendeeForms(
+            displayNames=[prof.displayName for prof in profiles if prof],
+            attendeeCount=seats.getAttendeeCount(conf),
+            nextPageToken=nextPageToken
+        ))
+
+    @endpoints.method(PAGE_GET_REQUEST, FilteredSessionsForm, path='getFilteredSessions',
                         http_method='GET', name='getFilteredSessions')
     def getFilteredSessions(self, request):
         """Return all the sessions of this Conference where typeOfSession!='Workshop' AND starttime <= (18-duration)."""
@@ -840,26 +1667,23 @@ class ConferenceApi(remote.Service):
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
         
-        # get sessions != Workshop
-        sessions = Session.query(ndb.OR(
-            Session.typeOfSession > 'Workshop',
-            Session.typeOfSession < 'Workshop'
-            )).fetch()
-        
-        fSessions=[]
-
-        # check for sessions not starting at 7
-        for session in sessions:            
-            if session.startTime < 19: # 19 is 7 pm
-                fSessions.append(session)
-
+        # get sessions != Workshop & not starting at 7 (19 is 7 pm); the query
+        # planner pushes the more selective filter to the datastore & applies
+        # the other one to the candidates in memory. A page ends early when
+        # the scan budget is used up; the next page resumes the scan.
+        pageSize, cursor = self._pageArgs(request)
+        fSessions, nextCursor, more = queryplanner.plan(Session, [
+            ('typeOfSession', '!=', 'Workshop'),
+            ('startTime', '<', 19),
+            ]).fetchPage(pageSize, cursor, partial=True)
 
         filteredSessions = ' %s %s' % (
                 'The filtered sessions are --------',','.join(session.name for session in fSessions))
         
         # Return filteredSessions List
-        return StringMessage(data=filteredSessions)
+        return FilteredSessionsForm(data=filteredSessions,
+            nextPageToken=nextCursor.urlsafe() if more and nextCursor else None)
 
         
-# registers API
-api = endpoints.api_server([ConferenceApi]) 
+# registers API; a sample of the API requests is traced, see tracing.py
+api = tracing.TracingMiddleware(endpoints.api_server([ConferenceApi]))
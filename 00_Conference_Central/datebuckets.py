@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# datebuckets.py -- Udacity conference server-side Python App Engine API; bucketed conference dates
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+from datetime import timedelta
+
+from google.appengine.ext import ndb
+
+from models import Conference
+
+# the datastore runs an IN filter as one query per value, 30 at most
+MAX_RANGE_BUCKETS = 30
+BUCKET_BACKFILL_BATCH = 100
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield 'd:%s' % day.isoformat()
+        day += timedelta(days=1)
+
+
+def _weeks(start, end):
+    # weeks start on Monday
+    day = start - timedelta(days=start.weekday())
+    while day <= end:
+        yield 'w:%s' % day.isoformat()
+        day += timedelta(days=7)
+
+
+def _months(start, end):
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield 'm:%04d-%02d' % (year, month)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _years(start, end):
+    for year in range(start.year, end.year + 1):
+        yield 'y:%04d' % year
+
+# finest first
+LEVELS = (_days, _weeks, _months, _years)
+
+
+def conferenceBuckets(startDate, endDate):
+    """Return the day, week, month & year buckets of the days from startDate
+    to endDate; a conference without startDate has none."""
+    if not startDate:
+        return []
+    endDate = max(endDate or startDate, startDate)
+    buckets = []
+    for level in LEVELS:
+        buckets.extend(level(startDate, endDate))
+    return buckets
+
+
+def rangeBuckets(start, end):
+    """Return the buckets of the finest level covering start to end with at
+    most MAX_RANGE_BUCKETS buckets; a conference overlapping the range has one
+    of them. Raises ValueError if even the years are too many."""
+    for level in LEVELS:
+        buckets = []
+        for bucket in level(start, end):
+            buckets.append(bucket)
+            if len(buckets) > MAX_RANGE_BUCKETS:
+                break
+        else:
+            return buckets
+    raise ValueError("A date range may span %d years at most." % MAX_RANGE_BUCKETS)
+
+
+def overlaps(conf, start, end):
+    """True if the days of conf overlap start to end; the buckets of a range
+    longer than MAX_RANGE_BUCKETS days are coarser than a day, so their
+    matches are checked with this."""
+    if not conf.startDate:
+        return False
+    return conf.startDate <= end and (conf.endDate or conf.startDate) >= start
+
+
+@ndb.transactional
+def _setBuckets(c_key):
+    # in a transaction, so a concurrent seatsAvailable sync is not overwritten
+    conf = c_key.get()
+    buckets = conferenceBuckets(conf.startDate, conf.endDate)
+    if conf.dateBuckets != buckets:
+        conf.dateBuckets = buckets
+        conf.put()
+
+
+def backfillDateBuckets(cursor=None):
+    """Write the date buckets of one batch of existing conferences.
+
+    Returns the cursor of the next batch or None when the backfill is done."""
+    if cursor:
+        cursor = ndb.Cursor(urlsafe=cursor)
+    c_keys, nextCursor, more = Conference.query().fetch_page(
+        BUCKET_BACKFILL_BATCH, start_cursor=cursor, keys_only=True)
+    for c_key in c_keys:
+        _setBuckets(c_key)
+    if more and nextCursor:
+        return nextCursor.urlsafe()
+    return None
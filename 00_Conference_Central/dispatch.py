@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# dispatch.py -- Udacity conference server-side Python App Engine API; coalesced background task dispatch
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+import contextlib
+import hashlib
+import json
+import time
+
+from google.appengine.api import memcache
+from google.appengine.api import taskqueue
+from google.appengine.ext import ndb
+
+MEMCACHE_QUEUED_KEY = "DISPATCH_QUEUED_%s"
+MEMCACHE_SUPPRESSED_KEY = "DISPATCH_SUPPRESSED_%s"
+# seconds a coalesced task waits for more work of its kind & key
+DEFAULT_WINDOW = 10
+# pull queues (see queue.yaml) holding the work items of coalesced tasks
+SPEAKER_QUEUE = 'speaker-updates'
+MAIL_QUEUE = 'confirmation-mails'
+LEASE_SECONDS = 60
+# the coalesced task types, whose counters getStats reports
+TASK_TYPES = ('confirmation-mail', 'featured-speaker', 'rebuild-schedule', 'sync-seats')
+
+
+def _taskName(taskType, key, window):
+    # keys may hold characters task names do not allow
+    bucket = int(time.time() // window)
+    return '%s-%s-%d' % (taskType, hashlib.sha1(key).hexdigest(), bucket)
+
+
+@ndb.tasklet
+def coalesceAsync(taskType, key, url, params=None, window=DEFAULT_WINDOW):
+    """Queue the task of taskType for key, unless it is already queued in
+    this window; see coalesceMultiAsync."""
+    yield coalesceMultiAsync(taskType, [(key, params)], url, window)
+
+
+@ndb.tasklet
+def coalesceMultiAsync(taskType, items, url, window=DEFAULT_WINDOW):
+    """Queue one task of taskType per (key, params) item, adding them in bulk.
+
+    Tasks are named by type, key & time window, so a key gets at most one task
+    per window; it runs window seconds later & so sees all the work of its
+    window. Queued & suppressed tasks are counted per taskType."""
+    tasks = {}
+    for key, params in items:
+        name = _taskName(taskType, key, window)
+        if name not in tasks:
+            tasks[name] = taskqueue.Task(name=name, params=params or {},
+                                         url=url, countdown=window)
+    tasks = tasks.values()
+    queue = taskqueue.Queue()
+    queued = 0
+    for start in range(0, len(tasks), taskqueue.MAX_TASKS_PER_ADD):
+        batch = tasks[start:start + taskqueue.MAX_TASKS_PER_ADD]
+        try:
+            yield queue.add_async(batch)
+        except (taskqueue.TaskAlreadyExistsError, taskqueue.TombstonedTaskError):
+            # the other tasks of the batch are still added
+            pass
+        queued += sum(1 for task in batch if task.was_enqueued)
+    memcache.offset_multi({MEMCACHE_QUEUED_KEY % taskType: queued,
+                           MEMCACHE_SUPPRESSED_KEY % taskType: len(items) - queued},
+                          initial_value=0)
+
+
+@ndb.tasklet
+def addWorkAsync(queueName, items):
+    """Add (tag, payload) work items to a pull queue in bulk; payloads are
+    JSON encoded & leased by tag."""
+    tasks = [taskqueue.Task(method='PULL', tag=tag, payload=json.dumps(payload))
+             for tag, payload in items]
+    queue = taskqueue.Queue(queueName)
+    for start in range(0, len(tasks), taskqueue.MAX_TASKS_PER_ADD):
+        yield queue.add_async(tasks[start:start + taskqueue.MAX_TASKS_PER_ADD])
+
+
+def leaseWork(queueName, tag):
+    """Lease all the work items under tag; returns (tasks, payloads).
+
+    Nobody else can lease the items for LEASE_SECONDS unless they are
+    released; see leasedWork."""
+    queue = taskqueue.Queue(queueName)
+    leased = []
+    while True:
+        tasks = queue.lease_tasks_by_tag(LEASE_SECONDS, taskqueue.MAX_TASKS_PER_LEASE, tag=tag)
+        leased.extend(tasks)
+        if len(tasks) < taskqueue.MAX_TASKS_PER_LEASE:
+            break
+    return leased, [json.loads(task.payload) for task in leased]
+
+
+def finishWork(queueName, tasks):
+    """Delete leased work items once they were processed."""
+    queue = taskqueue.Queue(queueName)
+    for start in range(0, len(tasks), taskqueue.MAX_TASKS_PER_ADD):
+        queue.delete_tasks(tasks[start:start + taskqueue.MAX_TASKS_PER_ADD])
+
+
+def releaseWork(queueName, tasks):
+    """Give up the leases of work items, so they can be leased again at once."""
+    queue = taskqueue.Queue(queueName)
+    for task in tasks:
+        queue.modify_task_lease(task, 0)
+
+
+@contextlib.contextmanager
+def leasedWork(queueName, tag):
+    """Lease the work items under tag for a with block; yields (tasks, payloads).
+
+    The items are deleted when the block succeeds. When it raises they are
+    released, so the retried push task leases them again instead of finding
+    nothing within LEASE_SECONDS."""
+    tasks, payloads = leaseWork(queueName, tag)
+    try:
+        yield tasks, payloads
+    except Exception:
+        releaseWork(queueName, tasks)
+        raise
+    finishWork(queueName, tasks)
+
+
+def getStats(taskType):
+    """Return (queued, suppressed) task counts of a task type."""
+    counters = memcache.get_multi([MEMCACHE_QUEUED_KEY % taskType,
+                                   MEMCACHE_SUPPRESSED_KEY % taskType])
+    return (counters.get(MEMCACHE_QUEUED_KEY % taskType, 0),
+            counters.get(MEMCACHE_SUPPRESSED_KEY % taskType, 0))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# dispatch_test.py -- Udacity conference server-side Python App Engine API; tests of the coalesced task work items
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+"""Run with the App Engine SDK on the path (or in GAE_SDK):
+
+    GAE_SDK=~/google-cloud-sdk/platform/google_appengine python dispatch_test.py
+"""
+
+import os
+import sys
+import unittest
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+if os.environ.get('GAE_SDK'):
+    sys.path.insert(0, os.environ['GAE_SDK'])
+import dev_appserver
+dev_appserver.fix_sys_path()
+sys.path.insert(0, APP_DIR)
+
+import webapp2
+from google.appengine.api import mail
+from google.appengine.api import taskqueue
+from google.appengine.ext import testbed
+
+
+class LeasedWorkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        self.testbed.init_app_identity_stub()
+        self.testbed.init_datastore_v3_stub()
+        self.testbed.init_mail_stub()
+        self.testbed.init_memcache_stub()
+        self.testbed.init_taskqueue_stub(root_path=APP_DIR)
+        self.sendMail = mail.send_mail
+
+    def tearDown(self):
+        mail.send_mail = self.sendMail
+        self.testbed.deactivate()
+
+    def testRetryAfterFailureProcessesTheWork(self):
+        import dispatch
+        import main
+        dispatch.addWorkAsync(dispatch.MAIL_QUEUE,
+                              [('user-1', 'Conference A'), ('user-1', 'Conference B')]
+                              ).get_result()
+        bodies = []
+
+        def failingOnce(sender, to, subject, body):
+            bodies.append(body)
+            if len(bodies) == 1:
+                raise RuntimeError('mail service down')
+        mail.send_mail = failingOnce
+
+        request = webapp2.Request.blank('/tasks/send_confirmation_email',
+            POST={'userId': 'user-1', 'email': 'owner@example.com'})
+        # the push task fails & is retried at once, within the lease time
+        self.assertRaises(RuntimeError, request.get_response, main.app)
+        response = request.get_response(main.app)
+
+        self.assertEqual(200, response.status_int)
+        self.assertEqual(2, len(bodies))
+        self.assertIn('Conference A', bodies[1])
+        self.assertIn('Conference B', bodies[1])
+        # the work items are gone once they were processed
+        queue = taskqueue.Queue(dispatch.MAIL_QUEUE)
+        self.assertEqual([], queue.lease_tasks_by_tag(60, 100, tag='user-1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
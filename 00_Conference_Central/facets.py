@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# facets.py -- Udacity conference server-side Python App Engine API; sharded conference facet counts
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+import random
+
+from google.appengine.api import memcache
+from google.appengine.ext import ndb
+
+from models import Conference
+from models import FacetShard
+
+NUM_FACET_SHARDS = 10
+MEMCACHE_FACETS_KEY = "CONFERENCE_FACETS"
+# a total read just before a change commits may be cached; it lives this long
+FACETS_CACHE_TIME = 60
+RECOUNT_BATCH_SIZE = 500
+
+CITY = 'city'
+TOPIC = 'topic'
+MONTH = 'month'
+# single value facets
+WITH_SEATS = 'withSeats'
+TOTAL = 'total'
+
+
+def _shardKeys():
+    return [ndb.Key(FacetShard, 'shard-%d' % i) for i in range(NUM_FACET_SHARDS)]
+
+
+def _facetKey(facet, value=''):
+    return '%s|%s' % (facet, value)
+
+
+def _merge(counts, more):
+    """Add more to counts, dropping the values that reach zero."""
+    for key, count in more.items():
+        count += counts.get(key, 0)
+        if count:
+            counts[key] = count
+        else:
+            counts.pop(key, None)
+    return counts
+
+
+def conferenceCounts(conf):
+    """Return the facet counts one conference adds."""
+    counts = {_facetKey(TOTAL): 1}
+    if conf.city:
+        counts[_facetKey(CITY, conf.city)] = 1
+    for topic in set(conf.topics):
+        counts[_facetKey(TOPIC, topic)] = 1
+    if conf.month:
+        counts[_facetKey(MONTH, conf.month)] = 1
+    if (conf.seatsAvailable or 0) > 0:
+        counts[_facetKey(WITH_SEATS)] = 1
+    return counts
+
+
+def _dropCache():
+    memcache.delete(MEMCACHE_FACETS_KEY)
+
+
+@ndb.tasklet
+def addCountsAsync(counts):
+    """Add counts to a random shard; runs in the caller's transaction and
+    drops the cached totals once it commits."""
+    key = random.choice(_shardKeys())
+    shard = yield key.get_async()
+    shard = shard or FacetShard(key=key, counts={})
+    shard.counts = _merge(dict(shard.counts or {}), counts)
+    yield shard.put_async()
+    ndb.get_context().call_on_commit(_dropCache)
+
+
+@ndb.transactional_tasklet(xg=True)
+def putConferencesAsync(confs):
+    """Store new conferences of one entity group together with their facet
+    counts; returns the keys."""
+    counts = {}
+    for conf in confs:
+        _merge(counts, conferenceCounts(conf))
+    keys, unused = yield ndb.put_multi_async(confs), addCountsAsync(counts)
+    raise ndb.Return(keys)
+
+
+@ndb.tasklet
+def seatsChangedAsync(old, new):
+    """Count a conference that sold out or got seats back; runs in the
+    transaction writing Conference.seatsAvailable."""
+    if ((old or 0) > 0) != ((new or 0) > 0):
+        yield addCountsAsync({_facetKey(WITH_SEATS): 1 if new > 0 else -1})
+
+
+def getFacets():
+    """Return {facet: {value: count}} of all conferences, summed over the
+    shards & cached; single value facets use the value ''."""
+    counts = memcache.get(MEMCACHE_FACETS_KEY)
+    if counts is None:
+        counts = {}
+        for shard in ndb.get_multi(_shardKeys()):
+            if shard:
+                _merge(counts, shard.counts or {})
+        memcache.set(MEMCACHE_FACETS_KEY, counts, time=FACETS_CACHE_TIME)
+    facets = {}
+    for key, count in counts.items():
+        facet, value = key.split('|', 1)
+        facets.setdefault(facet, {})[value] = count
+    return facets
+
+
+@ndb.transactional(xg=True)
+def _replaceShards(counts):
+    keys = _shardKeys()
+    ndb.put_multi([FacetShard(key=keys[0], counts=counts)] +
+                  [FacetShard(key=key, counts={}) for key in keys[1:]])
+    ndb.get_context().call_on_commit(_dropCache)
+
+
+def reconcile():
+    """Recount the facets from all conferences & replace the shards with the
+    result; returns the counts.
+
+    Conferences created or selling out while the recount runs may be off by
+    one until the next run."""
+    counts = {}
+    for conf in Conference.query().iter(batch_size=RECOUNT_BATCH_SIZE):
+        _merge(counts, conferenceCounts(conf))
+    _replaceShards(counts)
+    return counts
@@ -6,7 +6,17 @@
 import webapp2
 from google.appengine.api import app_identity
 from google.appengine.api import mail
+from google.appengine.api import taskqueue
 from conference import ConferenceApi
+import datebuckets
+import dispatch
+import facets
+import tracing
+import registrations
+import schedules
+import searchindex
+import seats
+import speakers
 
 class SetAnnouncementHandler(webapp2.RequestHandler):
     def get(self):
@@ -14,26 +24,152 @@ class SetAnnouncementHandler(webapp2.RequestHandler):
         ConferenceApi._cacheAnnouncement()
 
 
+class ReconcileFacetsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Recount the conference facets to repair drift."""
+        facets.reconcile()
+
+
 class SendConfirmationEmailHandler(webapp2.RequestHandler):
     def post(self):
-        """Send email confirming Conference creation."""
-        mail.send_mail(
-            'noreply@%s.appspotmail.com' % (
-                app_identity.get_application_id()),     # from
-            self.request.get('email'),                  # to
-            'You created a new Conference!',            # subj
-            'Hi, you have created a following '         # body
-            'conference:\r\n\r\n%s' % self.request.get(
-                'conferenceInfo')
-        )
+        """Send one email confirming the Conferences an owner created
+        within the dispatch window."""
+        with dispatch.leasedWork(dispatch.MAIL_QUEUE,
+                                 self.request.get('userId')) as (tasks, conferenceInfos):
+            # tasks queued before mails were coalesced carry the conference
+            if self.request.get('conferenceInfo'):
+                conferenceInfos.append(self.request.get('conferenceInfo'))
+            if conferenceInfos:
+                mail.send_mail(
+                    'noreply@%s.appspotmail.com' % (
+                        app_identity.get_application_id()),     # from
+                    self.request.get('email'),                  # to
+                    'You created a new Conference!',            # subj
+                    'Hi, you have created a following '         # body
+                    'conference:\r\n\r\n%s' % '\r\n\r\n'.join(
+                        conferenceInfos)
+                )
 
 class IdentifyFeatureSpeakerHandler(webapp2.RequestHandler):
     def post(self):
-        """Identify the speaker & put in memcache."""
-        ConferenceApi._identifyFeatureSpeaker(self.request.get('speaker'),self.request.get('confId'))
+        """Add the sessions created within the dispatch window to the speaker
+        tally & put featured speaker in memcache; add them to the sessions of
+        their speakers too."""
+        confId = self.request.get('confId')
+        with dispatch.leasedWork(dispatch.SPEAKER_QUEUE, confId) as (tasks, batches):
+            sessions = [session for batch in batches for session in batch]
+            # tasks queued before the work was coalesced carry the session
+            if self.request.get('sessionKey'):
+                sessions.append((self.request.get('speaker'), self.request.get('sessionKey'),
+                                 self.request.get('sessionName')))
+            if sessions:
+                ConferenceApi._identifyFeatureSpeaker(confId, sessions)
+                bySpeaker = {}
+                for speaker, sessionKey, sessionName in sessions:
+                    bySpeaker.setdefault(speaker, []).append(sessionKey)
+                for speaker, sessionKeys in bySpeaker.items():
+                    speakers.addSessions(speaker, sessionKeys)
+
+class SyncSeatsAvailableHandler(webapp2.RequestHandler):
+    def post(self):
+        """Write the sharded seat total back to the Conference."""
+        seats.syncSeatsAvailable(self.request.get('websafeConferenceKey'))
+
+class RebuildScheduleHandler(webapp2.RequestHandler):
+    def post(self):
+        """Rebuild the precomputed schedule of a conference."""
+        schedules.rebuildSchedule(self.request.get('websafeConferenceKey'))
+
+class MigrateWishListsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start re-keying WishList entities under their user's Profile."""
+        self.post()
+
+    def post(self):
+        """Migrate one batch of WishList entities & chain the next batch."""
+        cursor = ConferenceApi._migrateWishLists(self.request.get('cursor'))
+        if cursor:
+            taskqueue.add(params={'cursor': cursor},
+                url='/tasks/migrate_wishlists'
+            )
+
+class MigrateSessionsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start re-parenting Session entities under their Conference."""
+        self.post()
+
+    def post(self):
+        """Migrate one batch of Session entities & chain the next batch."""
+        cursor = ConferenceApi._migrateSessions(self.request.get('cursor'))
+        if cursor:
+            taskqueue.add(params={'cursor': cursor},
+                url='/tasks/migrate_sessions'
+            )
+
+class MigrateRegistrationsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start moving Profile.conferenceKeysToAttend to Registration entities."""
+        self.post()
+
+    def post(self):
+        """Migrate one batch of Profiles & chain the next batch."""
+        cursor = registrations.migrateRegistrations(self.request.get('cursor'))
+        if cursor:
+            taskqueue.add(params={'cursor': cursor},
+                url='/tasks/migrate_registrations'
+            )
+
+class BackfillSpeakersHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start adding existing sessions to the Speaker index."""
+        self.post()
+
+    def post(self):
+        """Backfill one batch of sessions & chain the next batch."""
+        cursor = speakers.backfillSpeakers(self.request.get('cursor'))
+        if cursor:
+            taskqueue.add(params={'cursor': cursor},
+                url='/tasks/backfill_speakers'
+            )
+
+class BackfillDateBucketsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start writing the date buckets of existing conferences."""
+        self.post()
+
+    def post(self):
+        """Backfill one batch of conferences & chain the next batch."""
+        cursor = datebuckets.backfillDateBuckets(self.request.get('cursor'))
+        if cursor:
+            taskqueue.add(params={'cursor': cursor},
+                url='/tasks/backfill_date_buckets'
+            )
+
+class IndexConferencesHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start (re)indexing all conferences for full text search."""
+        self.post()
+
+    def post(self):
+        """Index one batch of conferences & chain the next batch."""
+        cursor = searchindex.reindexConferences(self.request.get('cursor'))
+        if cursor:
+            taskqueue.add(params={'cursor': cursor},
+                url='/tasks/index_conferences'
+            )
         
-app = webapp2.WSGIApplication([
+# a sample of the task & cron requests is traced, see tracing.py
+app = tracing.TracingMiddleware(webapp2.WSGIApplication([
     ('/crons/set_announcement', SetAnnouncementHandler),
+    ('/crons/reconcile_facets', ReconcileFacetsHandler),
     ('/tasks/send_confirmation_email', SendConfirmationEmailHandler),
     ('/tasks/identify_featured_speaker', IdentifyFeatureSpeakerHandler),
-], debug=True)
+    ('/tasks/sync_seats_available', SyncSeatsAvailableHandler),
+    ('/tasks/rebuild_schedule', RebuildScheduleHandler),
+    ('/tasks/migrate_wishlists', MigrateWishListsHandler),
+    ('/tasks/migrate_sessions', MigrateSessionsHandler),
+    ('/tasks/migrate_registrations', MigrateRegistrationsHandler),
+    ('/tasks/backfill_speakers', BackfillSpeakersHandler),
+    ('/tasks/index_conferences', IndexConferencesHandler),
+    ('/tasks/backfill_date_buckets', BackfillDateBucketsHandler),
+], debug=True))
@@ -20,6 +20,12 @@ class Profile(ndb.Model):
     teeShirtSize = ndb.StringProperty(default='NOT_SPECIFIED')
     conferenceKeysToAttend = ndb.StringProperty(repeated=True)
 
+    # profiles are read on almost every request; ndb keeps them in the request
+    # context cache & in memcache so repeated key gets skip the datastore
+    _use_cache = True
+    _use_memcache = True
+    _memcache_timeout = 600
+
 class ProfileMiniForm(messages.Message):
     """ProfileMiniForm -- update Profile form message"""
     displayName = messages.StringField(1)
@@ -64,6 +70,10 @@ class Conference(ndb.Model):
     endDate         = ndb.DateProperty()
     maxAttendees    = ndb.IntegerProperty()
     seatsAvailable  = ndb.IntegerProperty()
+    # day, week, month & year buckets of the days of the conference, so a
+    # date range query is an IN filter on one property, see datebuckets.py;
+    # kept out of composite indexes, which would take a row per bucket
+    dateBuckets     = ndb.StringProperty(repeated=True)
 
 class ConferenceForm(messages.Message):
     """ConferenceForm -- Conference outbound form message"""
@@ -83,6 +93,7 @@ class ConferenceForm(messages.Message):
 class ConferenceForms(messages.Message):
     """ConferenceForms -- multiple Conference outbound form message"""
     items = messages.MessageField(ConferenceForm, 1, repeated=True)
+    nextPageToken = messages.StringField(2)
 
 class ConferenceQueryForm(messages.Message):
     """ConferenceQueryForm -- Conference query inbound form message"""
@@ -93,6 +104,13 @@ class ConferenceQueryForm(messages.Message):
 class ConferenceQueryForms(messages.Message):
     """ConferenceQueryForms -- multiple ConferenceQueryForm inbound form message"""
     filters = messages.MessageField(ConferenceQueryForm, 1, repeated=True)
+    pageSize = messages.IntegerField(2, variant=messages.Variant.INT32)
+    pageToken = messages.StringField(3)
+    # ConferenceForm fields to return; all of them if empty
+    fields = messages.StringField(4, repeated=True)
+    # words searched as prefixes in name, description & topics; results are
+    # then ordered by relevance instead of name
+    text = messages.StringField(5)
 
     # needed for conference & WishList registration
 class BooleanMessage(messages.Message):
@@ -143,6 +161,9 @@ class SessionForm(messages.Message):
 class SessionForms(messages.Message):
     """SessionForms -- multiple Sessions outbound form message"""
     items = messages.MessageField(SessionForm, 1, repeated=True)
+    nextPageToken = messages.StringField(2)
+    # version of the precomputed schedule the items were served from
+    version = messages.IntegerField(3)
 
 class SessionQueryForm(messages.Message):
     """SessionQueryForm -- Session query inbound form message"""
@@ -153,6 +174,12 @@ class SessionQueryForm(messages.Message):
 class SessionQueryForms(messages.Message):
     """SessionQueryForms -- multiple SessionQueryForm inbound form message"""
     filters = messages.MessageField(SessionQueryForm, 1, repeated=True)
+    pageSize = messages.IntegerField(2, variant=messages.Variant.INT32)
+    pageToken = messages.StringField(3)
+    # SessionForm fields to return; all of them if empty
+    fields = messages.StringField(4, repeated=True)
+    # SESSION_FIELDS to sort on, '-' prefixed for descending order
+    orderBy = messages.StringField(5, repeated=True)
 
 """
 Design Explanation:
@@ -160,6 +187,8 @@ Design Explanation:
 Wishlist is an independent Kind to maintain user & sessions relations
 It could have been designed to add with Profiles, but Profiles already have ConferenceToAttend relation.
 Thus to keep it simple, created another kind. This way all the operations would be fast.
+Each entry is stored under the user's Profile key with the session key as its id,
+so add & delete are single key operations and the user's wishlist is an ancestor query.
 
 """
 class WishList(ndb.Model):
@@ -176,6 +205,182 @@ class WishListForms(messages.Message):
     """WishListForms -- multiple WishListForm outbound form message"""    
     items = messages.MessageField(WishListForm, 1, repeated=True)
 
+class SpeakerForm(messages.Message):
+    """SpeakerForm -- speaker of a conference outbound form message"""
+    speaker         = messages.StringField(1)
+    sessionCount    = messages.IntegerField(2)
+
+class SpeakerForms(messages.Message):
+    """SpeakerForms -- one page of the speakers of a conference outbound form message"""
+    items           = messages.MessageField(SpeakerForm, 1, repeated=True)
+    nextPageToken   = messages.StringField(2)
+
+class AttendeeForms(messages.Message):
+    """AttendeeForms -- one page of the attendees of a conference outbound form message"""
+    displayNames    = messages.StringField(1, repeated=True)
+    attendeeCount   = messages.IntegerField(2)
+    nextPageToken   = messages.StringField(3)
+
+class BatchResultForm(messages.Message):
+    """BatchResultForm -- outcome of one item of a batch request outbound form message"""
+    index           = messages.IntegerField(1)
+    websafeKey      = messages.StringField(2)
+    error           = messages.StringField(3)
+
+class BatchResultForms(messages.Message):
+    """BatchResultForms -- outcome of every item of a batch request outbound form message"""
+    items           = messages.MessageField(BatchResultForm, 1, repeated=True)
+    created         = messages.IntegerField(2)
+
+class QueryCacheStatsForm(messages.Message):
+    """QueryCacheStatsForm -- query result cache counters outbound form message"""
+    kind        = messages.StringField(1)
+    hits        = messages.IntegerField(2)
+    misses      = messages.IntegerField(3)
+    generation  = messages.IntegerField(4)
+
+class DispatchStatForm(messages.Message):
+    """DispatchStatForm -- queued & coalesced away tasks of one task type outbound form message"""
+    taskType    = messages.StringField(1)
+    queued      = messages.IntegerField(2)
+    suppressed  = messages.IntegerField(3)
+
+class DispatchStatsForm(messages.Message):
+    """DispatchStatsForm -- task counters of all coalesced task types outbound form message"""
+    items       = messages.MessageField(DispatchStatForm, 1, repeated=True)
+
+class RpcStatForm(messages.Message):
+    """RpcStatForm -- traced calls of one API call (e.g. datastore_v3.Get) outbound form message"""
+    call            = messages.StringField(1)
+    perRequest      = messages.FloatField(2)
+    avgMs           = messages.FloatField(3)
+
+class TraceStatForm(messages.Message):
+    """TraceStatForm -- per request averages of a traced endpoint or task outbound form message"""
+    endpoint            = messages.StringField(1)
+    requests            = messages.IntegerField(2)
+    avgMs               = messages.FloatField(3)
+    avgSerializationMs  = messages.FloatField(4)
+    avgEntities         = messages.FloatField(5)
+    rpcs                = messages.MessageField(RpcStatForm, 6, repeated=True)
+
+class TraceStatsForm(messages.Message):
+    """TraceStatsForm -- traced endpoints & tasks outbound form message"""
+    # totals over all instances
+    items           = messages.MessageField(TraceStatForm, 1, repeated=True)
+    # latest traces of the instance that answered
+    recent          = messages.MessageField(TraceStatForm, 2, repeated=True)
+    sampleRate      = messages.FloatField(3)
+
+class FacetCountForm(messages.Message):
+    """FacetCountForm -- conferences having one value of a facet outbound form message"""
+    value           = messages.StringField(1)
+    count           = messages.IntegerField(2)
+
+class ConferenceFacetsForm(messages.Message):
+    """ConferenceFacetsForm -- conference counts per filter value outbound form message"""
+    cities          = messages.MessageField(FacetCountForm, 1, repeated=True)
+    topics          = messages.MessageField(FacetCountForm, 2, repeated=True)
+    months          = messages.MessageField(FacetCountForm, 3, repeated=True)
+    withSeats       = messages.IntegerField(4)
+    total           = messages.IntegerField(5)
+
+class FilteredSessionsForm(messages.Message):
+    """FilteredSessionsForm -- one page of the filtered session names outbound form message"""
+    data            = messages.StringField(1)
+    nextPageToken   = messages.StringField(2)
+
 class StringMessage(messages.Message):
     """StringMessage-- outbound (single) string message"""
-    data = messages.StringField(1, required=True)
\ No newline at end of file
+    data = messages.StringField(1, required=True)
+
+"""
+Design Explanation:
+
+Seats of a conference are kept in SeatShard entities instead of the single
+Conference entity, so registrations for a popular conference do not all contend
+on one entity group. Each shard is a root entity holding a slice of the seats;
+a registration takes a seat from one shard only. Conference.seatsAvailable is
+kept as a denormalized total, synced from the shards by a background task.
+"""
+class SeatShard(ndb.Model):
+    """SeatShard -- one slice of a Conference's available seats"""
+    seats = ndb.IntegerProperty(default=0, indexed=False)
+
+"""
+Design Explanation:
+
+SpeakerTally keeps, per conference, the sessions of every speaker so the featured
+speaker can be updated incrementally when a session is created, without querying
+all sessions again. It is keyed by the websafe conference key and is the durable
+copy of the per-conference featured speaker held in memcache.
+"""
+class SpeakerTally(ndb.Model):
+    """SpeakerTally -- per conference speaker to sessions tally"""
+    # speaker -> {websafe session key: session name}
+    speakers        = ndb.JsonProperty(indexed=False)
+    featuredSpeaker = ndb.StringProperty(indexed=False)
+    announcement    = ndb.TextProperty()
+
+"""
+Design Explanation:
+
+SpeakerSession is one small entity per (speaker, session) pair, keyed by the normalized
+speaker name (lower case, single spaces) and the websafe session key, so "Jane Doe" and
+"jane  doe" are one speaker. A speaker page is a keys only query on speakerId plus a get_multi
+of the sessions, and no entity grows with the number of sessions of a speaker. The pairs are
+written by the featured speaker task of every new session and by the /tasks/backfill_speakers
+job for sessions created before.
+"""
+class SpeakerSession(ndb.Model):
+    """SpeakerSession -- one session of a speaker across conferences"""
+    speakerId       = ndb.StringProperty()
+    name            = ndb.StringProperty(indexed=False)
+
+class Announcement(ndb.Model):
+    """Announcement -- durable set of nearly sold out conferences"""
+    # websafe conference key -> conference name
+    conferences = ndb.JsonProperty(indexed=False)
+
+"""
+Design Explanation:
+
+Registration records that a user registered for a conference. It is a child of the
+user's Profile with the websafe conference key as id, so a registration writes one small
+entity in the user's entity group (along with a seat shard) instead of rewriting the
+Profile, and the conferences of a user are an ancestor query. The attendees of a
+conference are a keys-only query on conferenceKey; the parents of the keys are the
+Profile keys. Profile.conferenceKeysToAttend is only read for profiles not migrated yet.
+"""
+class Registration(ndb.Model):
+    """Registration -- registration of a user (the parent Profile) for a conference"""
+    conferenceKey   = ndb.StringProperty(required=True)
+    registered      = ndb.DateTimeProperty(auto_now_add=True)
+
+"""
+Design Explanation:
+
+Schedule is the materialized session list of a conference: the encoded SessionForms,
+sorted by date & startTime. It is a child of the Conference key, in the same entity
+group as the sessions, so it is rebuilt from a consistent ancestor query inside a
+transaction. version goes up with every rebuild and is returned to the clients.
+"""
+class Schedule(ndb.Model):
+    """Schedule -- precomputed sessions of a conference"""
+    payload = ndb.BlobProperty()
+    version = ndb.IntegerProperty(indexed=False)
+
+"""
+Design Explanation:
+
+FacetShard holds a slice of the conference counts shown next to the filters: conferences
+per city, topic & month, with seats left and in total. A new conference adds to one random
+shard in the transaction that stores it, and the seatsAvailable sync adds to one when a
+conference sells out or gets seats back, so no single entity takes every write. The counts
+are the sum of all shards, cached in memcache; a daily job recounts them from the
+Conference entities to repair drift.
+"""
+class FacetShard(ndb.Model):
+    """FacetShard -- one slice of the conference facet counts"""
+    # "<facet>|<value>" -> count
+    counts = ndb.JsonProperty(indexed=False)
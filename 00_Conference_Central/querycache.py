@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# querycache.py -- Udacity conference server-side Python App Engine API; versioned query result cache
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+import hashlib
+import json
+import time
+
+from google.appengine.api import memcache
+
+MEMCACHE_GENERATION_KEY = "QUERY_CACHE_GEN_%s"
+MEMCACHE_RESULT_KEY = "QUERY_CACHE_%s_%s_%s"
+MEMCACHE_HITS_KEY = "QUERY_CACHE_HITS_%s"
+MEMCACHE_MISSES_KEY = "QUERY_CACHE_MISSES_%s"
+QUERY_CACHE_TIME = 300
+
+
+def _newGeneration():
+    # time based, so a generation lost to eviction is never handed out again
+    return int(time.time() * 1000)
+
+
+def getGeneration(kind):
+    """Return the current cache generation of a kind."""
+    key = MEMCACHE_GENERATION_KEY % kind
+    generation = memcache.get(key)
+    if generation is None:
+        memcache.add(key, _newGeneration())
+        generation = memcache.get(key)
+    return generation
+
+
+def invalidate(kind):
+    """Invalidate every cached query result of a kind in O(1).
+
+    Results are keyed by the generation they were computed in, so moving to
+    a new generation makes them unreachable; memcache expires them later."""
+    memcache.incr(MEMCACHE_GENERATION_KEY % kind, initial_value=_newGeneration())
+
+
+def signature(*parts):
+    """Return a stable digest of the (already normalized) query parts;
+    dates count as their ISO strings."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str)).hexdigest()
+
+
+def lookup(kind, sig):
+    """Return (cacheKey, cached result or None) for a query signature,
+    counting hits & misses.
+
+    The cache key pins the current generation, so a result stored with it
+    after an invalidation is never served."""
+    key = MEMCACHE_RESULT_KEY % (kind, getGeneration(kind), sig)
+    result = memcache.get(key)
+    if result is None:
+        memcache.incr(MEMCACHE_MISSES_KEY % kind, initial_value=0)
+    else:
+        memcache.incr(MEMCACHE_HITS_KEY % kind, initial_value=0)
+    return key, result
+
+
+def store(key, result):
+    """Cache a query result under the key returned by lookup."""
+    memcache.set(key, result, time=QUERY_CACHE_TIME)
+
+
+def getStats(kind):
+    """Return (hits, misses, generation) of a kind."""
+    counters = memcache.get_multi([MEMCACHE_HITS_KEY % kind,
+                                   MEMCACHE_MISSES_KEY % kind])
+    return (counters.get(MEMCACHE_HITS_KEY % kind, 0),
+            counters.get(MEMCACHE_MISSES_KEY % kind, 0),
+            getGeneration(kind))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# queryplanner.py -- Udacity conference server-side Python App Engine API; query planner with in-memory residual filters
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+import itertools
+import operator
+import os
+
+import endpoints
+import yaml
+
+from google.appengine.api import memcache
+from google.appengine.ext import ndb
+from google.appengine.ext.ndb import stats
+
+# entities a single request may read to answer a planned query
+SCAN_BUDGET = 2000
+SCAN_BATCH_SIZE = 200
+MEMCACHE_KIND_COUNT_KEY = "KIND_COUNT_%s"
+KIND_COUNT_CACHE_TIME = 3600
+
+# rough share of entities passing one predicate, by operator
+SELECTIVITY = {
+    '=': 0.1,
+    '<': 0.33,
+    '<=': 0.33,
+    '>': 0.33,
+    '>=': 0.33,
+    '!=': 0.9,
+}
+
+COMPARE = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+INDEX_FILE = os.path.join(os.path.dirname(__file__), 'index.yaml')
+
+
+def _loadIndexes(path):
+    """Return {kind: [property name lists]} of the non-ancestor composite indexes."""
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+    indexes = {}
+    for index in data.get('indexes') or []:
+        if index.get('ancestor'):
+            continue
+        names = [prop['name'] for prop in index.get('properties') or []]
+        indexes.setdefault(index['kind'], []).append(names)
+    return indexes
+
+INDEXES = _loadIndexes(INDEX_FILE)
+
+
+def _isCovered(kind, equalities, inequality):
+    """True if the datastore can run these equality filters plus one inequality."""
+    # equality-only queries are served by merge joins over the built-in indexes,
+    # as are inequality-only queries
+    if inequality is None or not equalities:
+        return True
+    for names in INDEXES.get(kind, []):
+        if names[-1] == inequality and set(names[:-1]) == set(equalities):
+            return True
+    return False
+
+
+def estimateSelectivity(filters):
+    """Estimate the share of entities matching all filters."""
+    selectivity = 1.0
+    for field, op, value in filters:
+        selectivity *= SELECTIVITY[op]
+    return selectivity
+
+
+def _kindCount(kind):
+    """Return the entity count of a kind from the datastore statistics, if any."""
+    key = MEMCACHE_KIND_COUNT_KEY % kind
+    count = memcache.get(key)
+    if count is None:
+        stat = stats.KindStat.query(stats.KindStat.kind_name == kind).get()
+        # -1 caches "no statistics yet" (e.g. the development server)
+        count = stat.count if stat else -1
+        memcache.set(key, count, time=KIND_COUNT_CACHE_TIME)
+    return count if count >= 0 else None
+
+
+def matches(entity, filters):
+    """Apply filters in memory with datastore semantics (any value of a
+    repeated property may match; missing values never match a range)."""
+    for field, op, value in filters:
+        values = getattr(entity, field)
+        if not isinstance(values, list):
+            values = [values]
+        compare = COMPARE[op]
+        if not any(v is not None and compare(v, value) for v in values):
+            return False
+    return True
+
+
+class QueryPlan(object):
+    """A query split in the filters pushed to the datastore & the residual
+    filters applied in memory to the streamed candidates."""
+
+    def __init__(self, model, pushed, residual):
+        self.model = model
+        self.pushed = pushed
+        self.residual = residual
+        self.selectivity = estimateSelectivity(pushed)
+        self.residualSelectivity = estimateSelectivity(residual)
+
+    def query(self):
+        q = self.model.query()
+        for field, op, value in self.pushed:
+            q = q.filter(ndb.query.FilterNode(field, op, value))
+        return q
+
+    def checkBudget(self, limit):
+        """Fail fast if filling limit results is expected to scan past the budget."""
+        count = _kindCount(self.model._get_kind())
+        if count is None:
+            return
+        candidates = count * self.selectivity
+        if limit:
+            candidates = min(candidates, limit / max(self.residualSelectivity, 0.001))
+        if candidates > SCAN_BUDGET:
+            raise endpoints.BadRequestException(
+                "Query is too broad; add a more selective filter.")
+
+    def fetchPage(self, limit=None, cursor=None, partial=False):
+        """Return (results, next cursor, more) for up to limit matches.
+
+        Stops with BadRequestException once SCAN_BUDGET candidates were read;
+        if partial, returns the matches found so far instead, with the cursor
+        to resume the scan (the page may then hold fewer, even no, results)."""
+        if not partial:
+            self.checkBudget(limit)
+        it = self.query().iter(batch_size=SCAN_BATCH_SIZE, start_cursor=cursor,
+                               produce_cursors=True)
+        results = []
+        scanned = 0
+        stopped = False
+        for entity in it:
+            scanned += 1
+            if scanned > SCAN_BUDGET:
+                raise endpoints.BadRequestException(
+                    "Query is too broad; add a more selective filter.")
+            if matches(entity, self.residual):
+                results.append(entity)
+                if limit and len(results) >= limit:
+                    stopped = True
+                    break
+            if partial and scanned >= SCAN_BUDGET:
+                stopped = True
+                break
+        more = it.has_next() if stopped else False
+        nextCursor = it.cursor_after() if more else None
+        return (results, nextCursor, more)
+
+
+def plan(model, filters):
+    """Choose the filters to push to the datastore for (field, operator, value)
+    filters on model: the most selective combination an index can serve."""
+    filters = list(filters)
+    kind = model._get_kind()
+    equalities = [f for f in filters if f[1] == '=']
+    # != becomes an OR of two datastore queries, which cannot be paged with
+    # cursors; it is always applied in memory
+    inequalityFields = sorted(set(f[0] for f in filters if f[1] not in ('=', '!=')))
+
+    best = None
+    for size in range(len(equalities), -1, -1):
+        for eqs in itertools.combinations(equalities, size):
+            eqFields = [f[0] for f in eqs]
+            for inequality in [None] + inequalityFields:
+                if not _isCovered(kind, eqFields, inequality):
+                    continue
+                pushed = list(eqs) + [f for f in filters
+                                      if f[1] not in ('=', '!=') and f[0] == inequality]
+                residual = [f for f in filters if f not in pushed]
+                candidate = QueryPlan(model, pushed, residual)
+                if best is None or candidate.selectivity < best.selectivity:
+                    best = candidate
+    return best
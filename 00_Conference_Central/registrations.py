@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# registrations.py -- Udacity conference server-side Python App Engine API; conference registrations
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+from google.appengine.ext import ndb
+
+from models import Profile
+from models import Registration
+
+REGISTRATION_MIGRATION_BATCH = 100
+
+
+def registrationKey(p_key, wsck):
+    """Return the Registration key of a user (Profile key) for a conference."""
+    return ndb.Key(Registration, wsck, parent=p_key)
+
+
+def isRegistered(prof, wsck):
+    """True if the user of prof is registered for the conference."""
+    if wsck in prof.conferenceKeysToAttend:
+        return True
+    return registrationKey(prof.key, wsck).get() is not None
+
+
+def getConferenceKeysToAttend(prof):
+    """Return the websafe keys of the conferences the user registered for."""
+    r_keys = Registration.query(ancestor=prof.key).fetch(keys_only=True)
+    return list(prof.conferenceKeysToAttend) + [r_key.id() for r_key in r_keys]
+
+
+def attendeesQuery(wsck):
+    """Return the query for the registrations of a conference, oldest first."""
+    return Registration.query(Registration.conferenceKey == wsck
+                              ).order(Registration.registered)
+
+
+@ndb.transactional
+def _migrateProfile(p_key):
+    prof = p_key.get()
+    if not prof.conferenceKeysToAttend:
+        return
+    ndb.put_multi([Registration(key=registrationKey(p_key, wsck), conferenceKey=wsck)
+                   for wsck in prof.conferenceKeysToAttend])
+    prof.conferenceKeysToAttend = []
+    prof.put()
+
+
+def migrateRegistrations(cursor=None):
+    """Move one batch of Profile.conferenceKeysToAttend lists to Registration entities.
+
+    Returns the cursor of the next batch or None when the migration is done."""
+    if cursor:
+        cursor = ndb.Cursor(urlsafe=cursor)
+    profiles, nextCursor, more = Profile.query().fetch_page(
+        REGISTRATION_MIGRATION_BATCH, start_cursor=cursor)
+    for prof in profiles:
+        if prof.conferenceKeysToAttend:
+            _migrateProfile(prof.key)
+    if more and nextCursor:
+        return nextCursor.urlsafe()
+    return None
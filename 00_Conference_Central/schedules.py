@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# schedules.py -- Udacity conference server-side Python App Engine API; precomputed conference schedules
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+from datetime import date
+from protorpc import protobuf
+from google.appengine.api import memcache
+from google.appengine.ext import ndb
+
+import dispatch
+import tracing
+
+from models import Schedule
+from models import Session
+from models import SessionForms
+from serializers import SESSION_PLAN
+
+MEMCACHE_SCHEDULE_KEY = "SCHEDULE_%s"
+# a cached schedule is at most this old, even if an update to memcache was lost
+SCHEDULE_CACHE_TIME = 600
+# a schedule is rebuilt at most once per interval, this long after a change
+SCHEDULE_REBUILD_INTERVAL = 5
+SCHEDULE_ID = 'schedule'
+
+
+def _scheduleKey(c_key):
+    return ndb.Key(Schedule, SCHEDULE_ID, parent=c_key)
+
+
+def _sortKey(sess):
+    return (sess.date or date.min, sess.startTime or 0, sess.name)
+
+
+@ndb.transactional
+def rebuildSchedule(wsck):
+    """Rebuild the schedule of a conference from its sessions; returns the payload."""
+    c_key = ndb.Key(urlsafe=wsck)
+    s_key = _scheduleKey(c_key)
+    conf, schedule = ndb.get_multi([c_key, s_key])
+    if not conf:
+        # nothing is stored for unknown conferences
+        return protobuf.encode_message(SessionForms())
+    sessions = Session.query(ancestor=c_key).fetch()
+    version = (schedule.version if schedule else 0) + 1
+    payload = protobuf.encode_message(SessionForms(
+        items=SESSION_PLAN.copyAll(sorted(sessions, key=_sortKey)),
+        version=version))
+    Schedule(key=s_key, payload=payload, version=version).put()
+    # memcache is only updated once the schedule is committed
+    ndb.get_context().call_on_commit(lambda: memcache.set(
+        MEMCACHE_SCHEDULE_KEY % wsck, payload, time=SCHEDULE_CACHE_TIME))
+    return payload
+
+
+def getSchedule(wsck):
+    """Return the schedule of a conference as SessionForms, from memcache,
+    else the datastore copy, else built now."""
+    cacheKey = MEMCACHE_SCHEDULE_KEY % wsck
+    payload = memcache.get(cacheKey)
+    if payload is None:
+        schedule = _scheduleKey(ndb.Key(urlsafe=wsck)).get()
+        if schedule:
+            payload = schedule.payload
+            memcache.add(cacheKey, payload, time=SCHEDULE_CACHE_TIME)
+        else:
+            payload = rebuildSchedule(wsck)
+    with tracing.serializing():
+        return protobuf.decode_message(SessionForms, payload)
+
+
+def schedulesChangedAsync(wscks):
+    """Queue the rebuild of the schedules of conferences whose sessions changed;
+    returns a future."""
+    # one task per conference per interval; later changes in the
+    # same interval are picked up by that task
+    return dispatch.coalesceMultiAsync('rebuild-schedule',
+        [(wsck, {'websafeConferenceKey': wsck}) for wsck in wscks],
+        '/tasks/rebuild_schedule', SCHEDULE_REBUILD_INTERVAL)
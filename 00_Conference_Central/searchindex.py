@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# searchindex.py -- Udacity conference server-side Python App Engine API; full text conference search
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+import re
+
+from google.appengine.api import search
+from google.appengine.ext import ndb
+
+from models import Conference
+
+INDEX_NAME = 'conferences'
+# shortest prefix a search term can match
+MIN_PREFIX_LENGTH = 2
+INDEX_BATCH_SIZE = 100
+# properties filterable in the index & the type of their fields
+NUMBER_FIELDS = ('month', 'maxAttendees')
+ATOM_FIELDS = ('city', 'topics')
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def _index():
+    return search.Index(name=INDEX_NAME)
+
+
+def tokenize(text):
+    """Return the case folded words of a text."""
+    return _WORD.findall((text or '').lower())
+
+
+def _prefixes(words):
+    """Return every prefix of the words of at least MIN_PREFIX_LENGTH
+    characters, the words themselves included."""
+    prefixes = set()
+    for word in words:
+        for end in range(MIN_PREFIX_LENGTH, len(word) + 1):
+            prefixes.add(word[:end])
+    return prefixes
+
+
+def _document(conf):
+    """Return the search document of a conference; its id is the websafe key."""
+    words = tokenize(conf.name) + tokenize(conf.description)
+    for topic in conf.topics:
+        words.extend(tokenize(topic))
+    fields = [
+        search.TextField(name='name', value=conf.name),
+        search.TextField(name='description', value=conf.description or ''),
+        # the search service only matches whole words, so prefix matching
+        # needs the prefixes indexed as words of their own
+        search.TextField(name='prefixes', value=' '.join(sorted(_prefixes(words)))),
+        search.AtomField(name='city', value=conf.city or ''),
+        search.NumberField(name='month', value=conf.month or 0),
+        search.NumberField(name='maxAttendees', value=conf.maxAttendees or 0),
+    ]
+    # a repeated field matches if any of its values does, like a repeated property
+    fields.extend(search.AtomField(name='topics', value=topic) for topic in conf.topics)
+    return search.Document(doc_id=conf.key.urlsafe(), fields=fields)
+
+
+def indexConferences(confs):
+    """Add or replace the search documents of conferences."""
+    documents = [_document(conf) for conf in confs]
+    for start in range(0, len(documents), search.MAXIMUM_DOCUMENTS_PER_PUT_REQUEST):
+        _index().put(documents[start:start + search.MAXIMUM_DOCUMENTS_PER_PUT_REQUEST])
+
+
+def reindexConferences(cursor=None):
+    """Index one batch of existing conferences.
+
+    Returns the cursor of the next batch or None when all are indexed."""
+    if cursor:
+        cursor = ndb.Cursor(urlsafe=cursor)
+    confs, nextCursor, more = Conference.query().fetch_page(
+        INDEX_BATCH_SIZE, start_cursor=cursor)
+    indexConferences(confs)
+    if more and nextCursor:
+        return nextCursor.urlsafe()
+    return None
+
+
+def _quote(value):
+    return '"%s"' % unicode(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _filterExpression(field, op, value):
+    """Return the query expression of a (field, operator, value) filter.
+
+    != on topics excludes the conferences having the topic at all."""
+    if field in NUMBER_FIELDS:
+        value = str(int(value))
+    else:
+        value = _quote(value)
+    if op == '!=':
+        return 'NOT %s = %s' % (field, value)
+    return '%s %s %s' % (field, op, value)
+
+
+def buildQuery(text, filters):
+    """Return the query string matching all words of text, each as a word
+    prefix of a conference's name, description or topics, plus the
+    (field, operator, value) filters."""
+    expressions = []
+    for word in tokenize(text):
+        if len(word) < MIN_PREFIX_LENGTH:
+            continue
+        # a match in the name scores higher than one elsewhere
+        expressions.append('(name:%s OR prefixes:%s)' % (_quote(word), _quote(word)))
+    for field, op, value in filters:
+        if field not in NUMBER_FIELDS + ATOM_FIELDS:
+            raise ValueError("%s cannot be searched." % field)
+        expressions.append(_filterExpression(field, op, value))
+    return ' AND '.join(expressions)
+
+
+def searchConferences(text, filters, limit, pageToken=None):
+    """Return (websafe conference keys, next page token) of one page of the
+    conferences matching text & filters, best matches first.
+
+    Raises ValueError for an unsearchable filter or a bad pageToken and
+    search.QueryError for text the search service cannot parse."""
+    try:
+        cursor = search.Cursor(web_safe_string=pageToken) if pageToken \
+            else search.Cursor()
+    except (TypeError, ValueError):
+        raise ValueError("Invalid pageToken.")
+    options = search.QueryOptions(
+        limit=limit,
+        cursor=cursor,
+        ids_only=True,
+        sort_options=search.SortOptions(
+            match_scorer=search.MatchScorer(),
+            expressions=[search.SortExpression(
+                expression='_score',
+                direction=search.SortExpression.DESCENDING,
+                default_value=0)]))
+    query = search.Query(query_string=buildQuery(text, filters), options=options)
+    try:
+        results = _index().search(query)
+    except search.InvalidRequest:
+        # the query itself was checked when it was built
+        if pageToken:
+            raise ValueError("Invalid pageToken.")
+        raise
+    nextPageToken = None
+    if results.cursor and len(results.results) == limit:
+        nextPageToken = results.cursor.web_safe_string
+    return ([document.doc_id for document in results.results], nextPageToken)
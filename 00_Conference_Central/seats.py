@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# seats.py -- Udacity conference server-side Python App Engine API; sharded seat inventory
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+import random
+
+from google.appengine.api import memcache
+from google.appengine.ext import ndb
+
+import announcements
+import dispatch
+import facets
+from models import ConflictException
+from models import Registration
+from models import SeatShard
+from registrations import isRegistered
+from registrations import registrationKey
+
+# upper bound of shards per conference; small conferences get one shard per seat
+MAX_SEAT_SHARDS = 20
+MEMCACHE_SEATS_KEY = "SEATS_AVAILABLE_%s"
+SEATS_CACHE_TIME = 60
+# Conference.seatsAvailable is synced from the shards at most once per interval
+SEATS_SYNC_INTERVAL = 10
+
+
+def _numShards(maxAttendees):
+    """Number of seat shards used by a conference of the given size."""
+    return min(MAX_SEAT_SHARDS, max(1, maxAttendees or 0))
+
+
+def _shardKeys(c_key, maxAttendees):
+    """Return the SeatShard keys of a conference."""
+    wsck = c_key.urlsafe()
+    return [ndb.Key(SeatShard, '%s-%d' % (wsck, i))
+            for i in range(_numShards(maxAttendees))]
+
+
+def _splitSeats(seats, numShards):
+    """Split seats over numShards as evenly as possible."""
+    return [seats // numShards + (1 if i < seats % numShards else 0)
+            for i in range(numShards)]
+
+
+def createShardsAsync(c_key, maxAttendees, seatsAvailable):
+    """Create the seat shards of a new conference; returns a future."""
+    keys = _shardKeys(c_key, maxAttendees)
+    split = _splitSeats(seatsAvailable or 0, len(keys))
+    return ndb.put_multi_async([SeatShard(key=key, seats=seats)
+                                for key, seats in zip(keys, split)])
+
+
+def _getShards(conf):
+    """Return the seat shards of conf, creating them for older conferences."""
+    return _getShardsMulti([conf])[0]
+
+
+def _getShardsMulti(confs):
+    """Return the seat shards of each conference, all read with one get_multi."""
+    keyLists = [_shardKeys(conf.key, conf.maxAttendees) for conf in confs]
+    allShards = ndb.get_multi([key for keys in keyLists for key in keys],
+                              use_cache=False)
+    shardLists = []
+    start = 0
+    for conf, keys in zip(confs, keyLists):
+        shards = allShards[start:start + len(keys)]
+        start += len(keys)
+        if None in shards:
+            # conference created before seats were sharded; seed the shards from
+            # Conference.seatsAvailable. get_or_insert keeps concurrent seeding safe.
+            split = _splitSeats(conf.seatsAvailable or 0, len(keys))
+            shards = [shard or SeatShard.get_or_insert(key.id(), seats=seats)
+                      for shard, key, seats in zip(shards, keys, split)]
+        shardLists.append(shards)
+    return shardLists
+
+
+def getSeatsAvailable(conf):
+    """Return the available seats of conf, summed over its shards & cached."""
+    return getSeatsAvailableMulti([conf])[0]
+
+
+def getSeatsAvailableMulti(confs):
+    """Return the available seats of each conference, reading memcache first."""
+    cacheKeys = [MEMCACHE_SEATS_KEY % conf.key.urlsafe() for conf in confs]
+    cached = memcache.get_multi(cacheKeys)
+    # the shards of all the conferences missing from memcache are read together
+    missed = [(conf, cacheKey) for conf, cacheKey in zip(confs, cacheKeys)
+              if cached.get(cacheKey) is None]
+    if missed:
+        totals = {}
+        for (conf, cacheKey), shards in zip(missed, _getShardsMulti(
+                [conf for conf, cacheKey in missed])):
+            totals[cacheKey] = sum(shard.seats for shard in shards)
+        memcache.set_multi(totals, time=SEATS_CACHE_TIME)
+        cached.update(totals)
+    return [cached[cacheKey] for cacheKey in cacheKeys]
+
+
+def getAttendeeCount(conf):
+    """Return the number of users registered for conf.
+
+    Every registration takes one seat, so this is maxAttendees less the
+    sharded seat total, without counting Registration entities."""
+    return max(0, (conf.maxAttendees or 0) - getSeatsAvailable(conf))
+
+
+def applySeatsAvailable(confs, forms=None):
+    """Overwrite seatsAvailable of the (unsaved) entities with the sharded totals.
+
+    If forms is given, the ConferenceForms copied from confs get the totals
+    instead; projection entities cannot be modified."""
+    if forms is not None:
+        for form, total in zip(forms, getSeatsAvailableMulti(confs)):
+            form.seatsAvailable = total
+        return confs
+    confs = [conf for conf in confs if conf]
+    for conf, total in zip(confs, getSeatsAvailableMulti(confs)):
+        conf.seatsAvailable = total
+    return confs
+
+
+@ndb.transactional(xg=True)
+def _takeSeat(p_key, shard_key, wsck):
+    """Move one seat from the shard to a Registration of the user; False if
+    the shard is empty."""
+    r_key = registrationKey(p_key, wsck)
+    prof, shard, registration = ndb.get_multi([p_key, shard_key, r_key])
+    # check if user already registered otherwise add
+    if registration or wsck in prof.conferenceKeysToAttend:
+        raise ConflictException(
+            "You have already registered for this conference")
+    if shard.seats <= 0:
+        return False
+    shard.seats -= 1
+    ndb.put_multi([shard, Registration(key=r_key, conferenceKey=wsck)])
+    return True
+
+
+@ndb.transactional(xg=True)
+def _giveBackSeat(p_key, shard_key, wsck):
+    """Move the user's seat back to the shard; False if user was not registered."""
+    r_key = registrationKey(p_key, wsck)
+    prof, shard, registration = ndb.get_multi([p_key, shard_key, r_key])
+    if registration:
+        r_key.delete()
+    elif wsck in prof.conferenceKeysToAttend:
+        # registered before Registration entities were introduced
+        prof.conferenceKeysToAttend.remove(wsck)
+        prof.put()
+    else:
+        return False
+    shard.seats += 1
+    shard.put()
+    return True
+
+
+def reserveSeat(conf, p_key):
+    """Register the user for conf by taking a seat from one of its shards."""
+    wsck = conf.key.urlsafe()
+    # try the shards that still look non-empty in random order; the transaction
+    # re-checks the shard, so a seat can never be handed out twice
+    candidates = [shard.key for shard in _getShards(conf) if shard.seats > 0]
+    random.shuffle(candidates)
+    for shard_key in candidates:
+        if _takeSeat(p_key, shard_key, wsck):
+            _seatsChanged(conf, -1)
+            return True
+
+    # the conference is sold out, unless the user already holds a seat
+    if isRegistered(p_key.get(), wsck):
+        raise ConflictException(
+            "You have already registered for this conference")
+    raise ConflictException(
+        "There are no seats available.")
+
+
+def releaseSeat(conf, p_key):
+    """Unregister the user from conf, giving the seat back to a random shard."""
+    shard_key = random.choice(_shardKeys(conf.key, conf.maxAttendees))
+    # make sure older conferences have their shards before writing to one
+    _getShards(conf)
+    if _giveBackSeat(p_key, shard_key, conf.key.urlsafe()):
+        _seatsChanged(conf, 1)
+        return True
+    return False
+
+
+def _seatsChanged(conf, delta):
+    """Adjust the cached total, the announcement & schedule the
+    Conference.seatsAvailable sync."""
+    wsck = conf.key.urlsafe()
+    cacheKey = MEMCACHE_SEATS_KEY % wsck
+    if delta < 0:
+        total = memcache.decr(cacheKey, -delta)
+    else:
+        total = memcache.incr(cacheKey, delta)
+    if total is None:
+        total = getSeatsAvailable(conf)
+    announcements.seatsChanged(wsck, conf.name, total - delta, total)
+
+    # one task per conference per interval; later changes in the
+    # same interval are picked up by that task
+    dispatch.coalesceAsync('sync-seats', wsck, '/tasks/sync_seats_available',
+        {'websafeConferenceKey': wsck}, SEATS_SYNC_INTERVAL).get_result()
+
+
+def syncSeatsAvailable(wsck):
+    """Write the sharded total back to Conference.seatsAvailable."""
+    c_key = ndb.Key(urlsafe=wsck)
+    conf = c_key.get()
+    if not conf:
+        return None
+    total = sum(shard.seats for shard in _getShards(conf))
+    memcache.set(MEMCACHE_SEATS_KEY % wsck, total, time=SEATS_CACHE_TIME)
+
+    @ndb.transactional(xg=True)
+    def _update():
+        conf = c_key.get()
+        old = conf.seatsAvailable
+        if old != total:
+            conf.seatsAvailable = total
+            conf.put()
+            # sold out conferences are not counted as having seats
+            facets.seatsChangedAsync(old, total).get_result()
+        return old
+    old = _update()
+    # repair the announcement in case it was rebuilt from the stale value
+    announcements.seatsChanged(wsck, conf.name, old, total)
+    return total
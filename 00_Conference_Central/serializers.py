@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# serializers.py -- Udacity conference server-side Python App Engine API; entity to message copiers
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+from protorpc import messages
+from google.appengine.ext import ndb
+
+from models import Conference
+from models import ConferenceForm
+from models import Profile
+from models import ProfileForm
+from models import Session
+from models import SessionForm
+from models import WishList
+from models import WishListForm
+import tracing
+
+
+class CopyPlan(object):
+    """Copies an ndb entity into a ProtoRPC message.
+
+    The fields to copy and their conversions are worked out once, when the plan
+    is built, instead of inspecting every field of every entity:
+    - date properties become date strings
+    - string properties copied into enum fields are looked up by enum name
+    - keyField, if given, gets the websafe key of the entity
+    only() derives a plan that copies just some of the message fields.
+    """
+
+    def __init__(self, model, message, keyField=None):
+        self.model = model
+        self.message = message
+        self.steps = []
+        self.keyField = None
+        # message fields this plan fills in; None means all of them
+        self.fields = None
+        self._subPlans = {}
+        for field in sorted(message.all_fields(), key=lambda f: f.number):
+            prop = model._properties.get(field.name)
+            if prop is not None:
+                self.steps.append((field.name, prop._code_name,
+                                   self._converter(prop, field)))
+            elif field.name == keyField:
+                self.keyField = keyField
+        # only messages with required fields need check_initialized()
+        self.checkInitialized = any(f.required for f in message.all_fields())
+
+    @staticmethod
+    def _converter(prop, field):
+        if isinstance(prop, (ndb.DateProperty, ndb.DateTimeProperty)):
+            return str
+        if isinstance(field, messages.EnumField):
+            return field.type.lookup_by_name
+        return None
+
+    def only(self, fields):
+        """Return a plan copying only the named message fields.
+
+        Raises ValueError for names that are not fields of the message."""
+        fields = frozenset(fields)
+        plan = self._subPlans.get(fields)
+        if plan is None:
+            names = set(field.name for field in self.message.all_fields())
+            unknown = fields - names
+            if unknown:
+                raise ValueError('Unknown fields: %s' % ', '.join(sorted(unknown)))
+            plan = CopyPlan.__new__(CopyPlan)
+            plan.__dict__.update(self.__dict__)
+            plan.steps = [step for step in self.steps if step[0] in fields]
+            if self.keyField not in fields:
+                plan.keyField = None
+            plan.fields = fields
+            plan._subPlans = {}
+            self._subPlans[fields] = plan
+        return plan
+
+    def properties(self):
+        """Return the model properties read by this plan."""
+        return [attr for name, attr, convert in self.steps]
+
+    def copy(self, entity, **extra):
+        """Copy one entity; extra sets further message fields unless empty."""
+        msg = self.message()
+        for name, attr, convert in self.steps:
+            value = getattr(entity, attr)
+            if convert is not None:
+                value = convert(value)
+            setattr(msg, name, value)
+        if self.keyField:
+            setattr(msg, self.keyField, entity.key.urlsafe())
+        for name, value in extra.items():
+            if value and (self.fields is None or name in self.fields):
+                setattr(msg, name, value)
+        if self.checkInitialized:
+            msg.check_initialized()
+        return msg
+
+    def copyAll(self, entities, **extra):
+        """Copy a whole result list in one call."""
+        copy = self.copy
+        with tracing.serializing():
+            return [copy(entity, **extra) for entity in entities]
+
+
+PROFILE_PLAN = CopyPlan(Profile, ProfileForm)
+CONFERENCE_PLAN = CopyPlan(Conference, ConferenceForm, keyField='websafeKey')
+SESSION_PLAN = CopyPlan(Session, SessionForm, keyField='sessionKey')
+WISHLIST_PLAN = CopyPlan(WishList, WishListForm)
@@ -7,3 +7,5 @@
 # Web Client ID obtained from Google Developer Console against project conference-central-vineeta
 WEB_CLIENT_ID = '196147112543-34u4ldp70fjdn9cagqcf9qmq20c7aj4j.apps.googleusercontent.com'
 
+# Share of the requests traced by tracing.TracingMiddleware (0 turns tracing off)
+TRACE_SAMPLE_RATE = 0.05
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# speakers.py -- Udacity conference server-side Python App Engine API; normalized speaker index
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+from google.appengine.ext import ndb
+
+from models import Session
+from models import SpeakerSession
+
+SPEAKER_BACKFILL_BATCH = 100
+
+
+def normalizeSpeaker(name):
+    """Return the lookup id of a speaker name: lower case with single spaces."""
+    return ' '.join((name or '').lower().split())
+
+
+def _speakerSession(name, sessionKey):
+    # one entity per (speaker, session) pair, so writing it again is a no-op
+    speakerId = normalizeSpeaker(name)
+    return SpeakerSession(id='%s|%s' % (speakerId, sessionKey),
+                          speakerId=speakerId, name=name)
+
+
+def sessionKeyOf(key):
+    """Return the websafe session key of a SpeakerSession key."""
+    # websafe keys have no '|', the speaker name may
+    return key.id().rsplit('|', 1)[1]
+
+
+def speakerQuery(name):
+    """Return the query of the SpeakerSession entities of a speaker name."""
+    return SpeakerSession.query(SpeakerSession.speakerId == normalizeSpeaker(name))
+
+
+def addSessions(name, sessionKeys):
+    """Add websafe session keys to the speaker of name; retried tasks write
+    the same entities again instead of adding a session twice."""
+    ndb.put_multi([_speakerSession(name, sessionKey) for sessionKey in sessionKeys])
+
+
+def renameSession(name, oldKey, newKey):
+    """Replace a websafe session key that changed."""
+    _speakerSession(name, newKey).put()
+    _speakerSession(name, oldKey).key.delete()
+
+
+def backfillSpeakers(cursor=None):
+    """Add one batch of existing sessions to their speakers.
+
+    Returns the cursor of the next batch or None when the backfill is done."""
+    if cursor:
+        cursor = ndb.Cursor(urlsafe=cursor)
+    sessions, nextCursor, more = Session.query().fetch_page(
+        SPEAKER_BACKFILL_BATCH, start_cursor=cursor, projection=[Session.speaker])
+    ndb.put_multi([_speakerSession(sess.speaker, sess.key.urlsafe())
+                   for sess in sessions if normalizeSpeaker(sess.speaker)])
+    if more and nextCursor:
+        return nextCursor.urlsafe()
+    return None
@@ -270,7 +270,9 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
         {enumValue: 'CITY', displayName: 'City'},
         {enumValue: 'TOPIC', displayName: 'Topic'},
         {enumValue: 'MONTH', displayName: 'Start month'},
-        {enumValue: 'MAX_ATTENDEES', displayName: 'Max Attendees'}
+        {enumValue: 'MAX_ATTENDEES', displayName: 'Max Attendees'},
+        {enumValue: 'START_DATE', displayName: 'Start date'},
+        {enumValue: 'DATE_RANGE', displayName: 'Dates (from/to)'}
     ]
 
     /**
@@ -423,12 +425,55 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
         }
     };
 
+    /**
+     * The conference fields shown in the list; the server only returns (and reads) these.
+     * @type {string[]}
+     */
+    $scope.listFields = ['websafeKey', 'name', 'city', 'startDate', 'organizerDisplayName',
+        'maxAttendees', 'seatsAvailable'];
+
+    /**
+     * Identifies the latest list query so pages of a superseded query are dropped.
+     * @type {number}
+     */
+    $scope.queryId = 0;
+
+    /**
+     * Holds the token of the next page of the current list; undefined when it is complete.
+     * @type {string}
+     */
+    $scope.nextPageToken = undefined;
+
+    /**
+     * Fetches the next page of the current list; set by the query that filled the list.
+     */
+    $scope.loadMore = angular.noop;
+
+    /**
+     * Appends a page to the list, showing its first conferences if they start a new page.
+     *
+     * @param resp the response of a paged list method.
+     */
+    var appendPage = function (resp) {
+        var firstPage = Math.ceil($scope.conferences.length / $scope.pagination.pageSize);
+        angular.forEach(resp.items, function (conference) {
+            $scope.conferences.push(conference);
+        });
+        if ($scope.conferences.length > 0) {
+            $scope.pagination.currentPage = Math.min(firstPage, $scope.pagination.numberOfPages() - 1);
+        }
+        $scope.nextPageToken = resp.nextPageToken;
+    };
+
     /**
      * Invokes the conference.queryConferences API.
+     * Fetches the first page; loadMore fetches the next one with the stored nextPageToken.
      */
     $scope.queryConferencesAll = function () {
         var sendFilters = {
-            filters: []
+            filters: [],
+            pageSize: $scope.pagination.pageSize,
+            fields: $scope.listFields
         }
         for (var i = 0; i < $scope.filters.length; i++) {
             var filter = $scope.filters[i];
@@ -441,31 +486,46 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
             }
         }
         $scope.loading = true;
-        gapi.client.conference.queryConferences(sendFilters).
-            execute(function (resp) {
-                $scope.$apply(function () {
-                    $scope.loading = false;
-                    if (resp.error) {
-                        // The request has failed.
-                        var errorMessage = resp.error.message || '';
-                        $scope.messages = 'Failed to query conferences : ' + errorMessage;
-                        $scope.alertStatus = 'warning';
-                        $log.error($scope.messages + ' filters : ' + JSON.stringify(sendFilters));
-                    } else {
-                        // The request has succeeded.
-                        $scope.submitted = false;
-                        $scope.messages = 'Query succeeded : ' + JSON.stringify(sendFilters);
-                        $scope.alertStatus = 'success';
-                        $log.info($scope.messages);
-
-                        $scope.conferences = [];
-                        angular.forEach(resp.items, function (conference) {
-                            $scope.conferences.push(conference);
-                        });
-                    }
-                    $scope.submitted = true;
+        $scope.conferences = [];
+        $scope.pagination.currentPage = 0;
+        $scope.nextPageToken = undefined;
+        var queryId = ++$scope.queryId;
+        var fetchPage = function (pageToken) {
+            $scope.loading = true;
+            sendFilters.pageToken = pageToken;
+            gapi.client.conference.queryConferences(sendFilters).
+                execute(function (resp) {
+                    $scope.$apply(function () {
+                        if (queryId != $scope.queryId) {
+                            return;
+                        }
+                        handlePage(resp);
+                    });
                 });
-            });
+        };
+        var handlePage = function (resp) {
+            $scope.loading = false;
+            if (resp.error) {
+                // The request has failed.
+                var errorMessage = resp.error.message || '';
+                $scope.messages = 'Failed to query conferences : ' + errorMessage;
+                $scope.alertStatus = 'warning';
+                $log.error($scope.messages + ' filters : ' + JSON.stringify(sendFilters));
+            } else {
+                // The request has succeeded.
+                $scope.submitted = false;
+                $scope.messages = 'Query succeeded : ' + JSON.stringify(sendFilters);
+                $scope.alertStatus = 'success';
+                $log.info($scope.messages);
+
+                appendPage(resp);
+            }
+            $scope.submitted = true;
+        };
+        $scope.loadMore = function () {
+            fetchPage($scope.nextPageToken);
+        };
+        fetchPage(undefined);
     }
 
     /**
@@ -473,36 +533,53 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
      */
     $scope.getConferencesCreated = function () {
         $scope.loading = true;
-        gapi.client.conference.getConferencesCreated().
-            execute(function (resp) {
-                $scope.$apply(function () {
-                    $scope.loading = false;
-                    if (resp.error) {
-                        // The request has failed.
-                        var errorMessage = resp.error.message || '';
-                        $scope.messages = 'Failed to query the conferences created : ' + errorMessage;
-                        $scope.alertStatus = 'warning';
-                        $log.error($scope.messages);
-
-                        if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
-                            oauth2Provider.showLoginModal();
+        $scope.conferences = [];
+        $scope.pagination.currentPage = 0;
+        $scope.nextPageToken = undefined;
+        var queryId = ++$scope.queryId;
+        var fetchPage = function (pageToken) {
+            $scope.loading = true;
+            gapi.client.conference.getConferencesCreated({
+                pageSize: $scope.pagination.pageSize,
+                pageToken: pageToken
+            }).
+                execute(function (resp) {
+                    $scope.$apply(function () {
+                        if (queryId != $scope.queryId) {
                             return;
                         }
-                    } else {
-                        // The request has succeeded.
-                        $scope.submitted = false;
-                        $scope.messages = 'Query succeeded : Conferences you have created';
-                        $scope.alertStatus = 'success';
-                        $log.info($scope.messages);
-
-                        $scope.conferences = [];
-                        angular.forEach(resp.items, function (conference) {
-                            $scope.conferences.push(conference);
-                        });
-                    }
-                    $scope.submitted = true;
+                        handlePage(resp);
+                    });
                 });
-            });
+        };
+        var handlePage = function (resp) {
+            $scope.loading = false;
+            if (resp.error) {
+                // The request has failed.
+                var errorMessage = resp.error.message || '';
+                $scope.messages = 'Failed to query the conferences created : ' + errorMessage;
+                $scope.alertStatus = 'warning';
+                $log.error($scope.messages);
+
+                if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
+                    oauth2Provider.showLoginModal();
+                    return;
+                }
+            } else {
+                // The request has succeeded.
+                $scope.submitted = false;
+                $scope.messages = 'Query succeeded : Conferences you have created';
+                $scope.alertStatus = 'success';
+                $log.info($scope.messages);
+
+                appendPage(resp);
+            }
+            $scope.submitted = true;
+        };
+        $scope.loadMore = function () {
+            fetchPage($scope.nextPageToken);
+        };
+        fetchPage(undefined);
     };
 
     /**
@@ -511,6 +588,9 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
      */
     $scope.getConferencesAttend = function () {
         $scope.loading = true;
+        $scope.queryId++;
+        $scope.nextPageToken = undefined;
+        $scope.loadMore = angular.noop;
         gapi.client.conference.getConferencesToAttend().
             execute(function (resp) {
                 $scope.$apply(function () {
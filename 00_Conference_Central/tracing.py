@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# tracing.py -- Udacity conference server-side Python App Engine API; per request RPC tracing
+# Udacity - NanoDegree FullStack Web Developer - Project 4
+# Created by: Vineeta Gupta
+# Date: 3 March 2016
+
+import collections
+import random
+import threading
+import time
+
+from google.appengine.api import apiproxy_stub_map
+from google.appengine.api import memcache
+
+from settings import TRACE_SAMPLE_RATE
+
+MEMCACHE_TRACE_KEY = "TRACE_%s|%s"
+# list of all the MEMCACHE_TRACE_KEY counters
+MEMCACHE_TRACE_COUNTERS_KEY = "TRACE_COUNTERS"
+# recent traces kept by each instance
+TRACE_RING_SIZE = 100
+# RPCs whose responses or requests carry entities
+ENTITY_COUNTS = {
+    ('datastore_v3', 'Get'): lambda request, response: response.entity_size(),
+    ('datastore_v3', 'Put'): lambda request, response: request.entity_size(),
+    ('datastore_v3', 'RunQuery'): lambda request, response: response.result_size(),
+    ('datastore_v3', 'Next'): lambda request, response: response.result_size(),
+}
+
+_local = threading.local()
+_ring = collections.deque(maxlen=TRACE_RING_SIZE)
+_knownCounters = set()
+
+
+class Trace(object):
+    """RPC counts & latencies, entity count & serialization time of one request."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = time.time()
+        self.ms = 0.0
+        self.rpcs = {}
+        self.rpcMs = {}
+        self.entities = 0
+        self.serializationMs = 0.0
+        self._started = {}
+
+
+def _current():
+    return getattr(_local, 'trace', None)
+
+
+def _preCall(service, call, request, response, rpc):
+    trace = _current()
+    if trace is not None:
+        trace._started[id(rpc)] = time.time()
+
+
+def _postCall(service, call, request, response, rpc):
+    trace = _current()
+    if trace is None:
+        return
+    name = '%s.%s' % (service, call)
+    trace.rpcs[name] = trace.rpcs.get(name, 0) + 1
+    started = trace._started.pop(id(rpc), None)
+    if started is not None:
+        trace.rpcMs[name] = trace.rpcMs.get(name, 0.0) + (time.time() - started) * 1000
+    count = ENTITY_COUNTS.get((service, call))
+    if count is not None:
+        try:
+            trace.entities += count(request, response)
+        except Exception:
+            # a failed RPC may leave the response unset
+            pass
+
+apiproxy_stub_map.apiproxy.GetPreCallHooks().Append('tracing', _preCall)
+apiproxy_stub_map.apiproxy.GetPostCallHooks().Append('tracing', _postCall)
+
+
+class serializing(object):
+    """Context manager adding its run time to the serialization time of the
+    current trace, if any."""
+
+    def __enter__(self):
+        self.start = time.time()
+
+    def __exit__(self, *exc):
+        trace = _current()
+        if trace is not None:
+            trace.serializationMs += (time.time() - self.start) * 1000
+
+
+def _record(trace):
+    """Keep a finished trace in the ring & add it to the memcache totals."""
+    _ring.append(trace)
+    offsets = {'requests': 1,
+               'us': int(trace.ms * 1000),
+               'serialization_us': int(trace.serializationMs * 1000),
+               'entities': trace.entities}
+    for name, count in trace.rpcs.items():
+        offsets['rpc.' + name] = count
+        offsets['rpc_us.' + name] = int(trace.rpcMs.get(name, 0.0) * 1000)
+    counters = dict((MEMCACHE_TRACE_KEY % (trace.endpoint, metric), value)
+                    for metric, value in offsets.items())
+    memcache.offset_multi(counters, initial_value=0)
+    new = set(counters) - _knownCounters
+    if new:
+        _addCounters(new)
+
+
+def _addCounters(new):
+    """Add counter keys to the list of all counters in memcache."""
+    client = memcache.Client()
+    for attempt in range(3):
+        counters = client.gets(MEMCACHE_TRACE_COUNTERS_KEY)
+        if counters is None:
+            if client.add(MEMCACHE_TRACE_COUNTERS_KEY, sorted(new)):
+                break
+            continue
+        missing = new - set(counters)
+        if not missing or client.cas(MEMCACHE_TRACE_COUNTERS_KEY,
+                                     counters + sorted(missing)):
+            break
+    _knownCounters.update(new)
+
+
+class TracingMiddleware(object):
+    """WSGI middleware tracing a TRACE_SAMPLE_RATE share of the requests.
+
+    Untraced requests only cost a random number; the RPC hooks return at
+    once when no trace is active."""
+
+    def __init__(self, app, sampleRate=None):
+        self.app = app
+        self.sampleRate = TRACE_SAMPLE_RATE if sampleRate is None else sampleRate
+
+    def __call__(self, environ, start_response):
+        if random.random() >= self.sampleRate:
+            return self.app(environ, start_response)
+        trace = _local.trace = Trace(environ.get('PATH_INFO', ''))
+        try:
+            # responses of both apps are built before they are returned
+            return self.app(environ, start_response)
+        finally:
+            _local.trace = None
+            trace.ms = (time.time() - trace.start) * 1000
+            _record(trace)
+
+
+def getRecent():
+    """Return the recent traces of this instance, newest first."""
+    return list(reversed(_ring))
+
+
+def getStats():
+    """Return {endpoint: {metric: total}} over all instances, from memcache.
+
+    Times are in microseconds (us); rpc.<call> & rpc_us.<call> metrics hold
+    the number & time of the calls of each API call."""
+    counters = memcache.get(MEMCACHE_TRACE_COUNTERS_KEY) or []
+    stats = {}
+    for key, value in memcache.get_multi(counters).items():
+        endpoint, metric = key[len('TRACE_'):].split('|', 1)
+        stats.setdefault(endpoint, {})[metric] = value
+    return stats
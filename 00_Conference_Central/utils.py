@@ -3,14 +3,33 @@
 # Created by: Vineeta Gupta
 # Date: 3 March 2016
 
+import collections
+import hashlib
 import json
 import os
+import threading
 import time
 import uuid
 
+from google.appengine.api import memcache
 from google.appengine.api import urlfetch
 from models import Profile
 
+TOKENINFO_URL = 'https://www.googleapis.com/oauth2/v1/tokeninfo?%s=%s'
+# a tokeninfo call never takes longer than this (seconds)
+TOKENINFO_DEADLINE = 2
+# a failed call is retried once, at once; the request never sleeps
+TOKENINFO_ATTEMPTS = 2
+# all tokeninfo calls of one request together never take longer than this
+TOKENINFO_TOTAL_TIME = 3
+TOKEN_CACHE_SIZE = 1000
+# a resolved token is cached at most this long, and never past its expiry
+TOKEN_CACHE_TIME = 300
+MEMCACHE_TOKEN_KEY = "TOKEN_USER_ID_%s"
+# a rejected token, or one tokeninfo could not be asked about, is not looked
+# up again for this long
+TOKEN_FAILURE_CACHE_TIME = 30
+
 def getUserId(user, id_type="email"):
     ''' Getting logged in user id. '''
     if id_type == "email":
@@ -23,22 +42,7 @@ def getUserId(user, id_type="email"):
         token_type = 'id_token'
         if 'OAUTH_USER_ID' in os.environ:
             token_type = 'access_token'
-        url = ('https://www.googleapis.com/oauth2/v1/tokeninfo?%s=%s'
-               % (token_type, token))
-        user = {}
-        wait = 1
-        for i in range(3):
-            resp = urlfetch.fetch(url)
-            if resp.status_code == 200:
-                user = json.loads(resp.content)
-                break
-            elif resp.status_code == 400 and 'invalid_token' in resp.content:
-                url = ('https://www.googleapis.com/oauth2/v1/tokeninfo?%s=%s'
-                       % ('access_token', token))
-            else:
-                time.sleep(wait)
-                wait = wait + i
-        return user.get('user_id', '')
+        return _getOAuthUserId(token_type, token)
 
     if id_type == "custom":
         # implement your own user_id creation and getting algorythm
@@ -49,3 +53,131 @@ def getUserId(user, id_type="email"):
             return profile.id()
         else:
             return str(uuid.uuid1().get_hex())
+
+
+class _TokenCache(object):
+    """In-process LRU of token -> (user_id, expiry time)."""
+
+    def __init__(self, size):
+        self._size = size
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return None
+            if item[1] <= time.time():
+                return None
+            # re-insert to mark as most recently used
+            self._items[key] = item
+            return item[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (value, time.time() + ttl)
+            while len(self._items) > self._size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+_tokenCache = _TokenCache(TOKEN_CACHE_SIZE)
+
+
+def _fetchTokenInfo(url, deadline=TOKENINFO_DEADLINE):
+    """Fetch a tokeninfo url; returns (status_code, content)."""
+    rpc = urlfetch.create_rpc(deadline=deadline)
+    urlfetch.make_fetch_call(rpc, url)
+    resp = rpc.get_result()
+    return resp.status_code, resp.content
+
+# replaced by a TokenInfoStub in tests to avoid calling the real service
+tokenInfoFetcher = _fetchTokenInfo
+
+
+class TokenInfoStub(object):
+    """Local stand-in for the tokeninfo service, usable as tokenInfoFetcher.
+
+    tokens maps a token to the tokeninfo dict returned for it; unknown tokens
+    get the service's 400 invalid_token answer."""
+
+    def __init__(self, tokens=None):
+        self.tokens = dict(tokens or {})
+        self.calls = []
+
+    def __call__(self, url, deadline=None):
+        self.calls.append(url)
+        token = url.rsplit('=', 1)[-1]
+        if token in self.tokens:
+            return 200, json.dumps(self.tokens[token])
+        return 400, json.dumps({'error': 'invalid_token'})
+
+
+def _tokenCacheKey(token):
+    # tokens are long & secret; cache under a digest instead
+    return hashlib.sha256(token).hexdigest()
+
+
+def _getOAuthUserId(token_type, token):
+    """Resolve a token to a user id through the in-process & memcache caches,
+    falling back to the tokeninfo service."""
+    cacheKey = _tokenCacheKey(token)
+    user_id = _tokenCache.get(cacheKey)
+    if user_id is not None:
+        return user_id
+    cached = memcache.get(MEMCACHE_TOKEN_KEY % cacheKey)
+    if cached is not None:
+        user_id, expires = cached
+        _tokenCache.set(cacheKey, user_id, expires - time.time())
+        return user_id
+
+    user = _lookUpToken(token_type, token)
+    user_id = user.get('user_id', '')
+    if user_id:
+        ttl = min(int(user.get('expires_in', TOKEN_CACHE_TIME)), TOKEN_CACHE_TIME)
+    else:
+        # '' is cached too, so bad tokens & an outage do not cost every
+        # request the full round trip
+        ttl = TOKEN_FAILURE_CACHE_TIME
+    if ttl > 0:
+        _tokenCache.set(cacheKey, user_id, ttl)
+        memcache.set(MEMCACHE_TOKEN_KEY % cacheKey,
+                     (user_id, time.time() + ttl), time=ttl)
+    return user_id
+
+
+def _lookUpToken(token_type, token):
+    """Return the tokeninfo dict of a token, {} if it is rejected or the
+    service did not answer within TOKENINFO_TOTAL_TIME; a failed call is
+    retried at once, without sleeping."""
+    url = TOKENINFO_URL % (token_type, token)
+    end = time.time() + TOKENINFO_TOTAL_TIME
+    failures = 0
+    while failures < TOKENINFO_ATTEMPTS:
+        remaining = end - time.time()
+        if remaining <= 0:
+            break
+        try:
+            status_code, content = tokenInfoFetcher(
+                url, min(TOKENINFO_DEADLINE, remaining))
+        except urlfetch.Error:
+            status_code, content = None, ''
+        if status_code == 200:
+            return json.loads(content)
+        if status_code == 400 and 'invalid_token' in content:
+            if url == TOKENINFO_URL % ('access_token', token):
+                return {}
+            # not an id token; ask again at once as an access token
+            url = TOKENINFO_URL % ('access_token', token)
+            continue
+        if status_code is not None and status_code < 500:
+            # rejected; asking again gives the same answer
+            return {}
+        # the service failed; a second failure is cached as '' by the caller,
+        # which keeps an outage from being asked again by every request
+        failures += 1
+    return {}